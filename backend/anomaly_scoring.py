@@ -0,0 +1,132 @@
+"""Batch anomaly scoring for expenses with robust per-merchant / per-category statistics.
+
+Each expense is scored with the modified z-score 0.6745 * (amount - median) / MAD (Iglewicz & Hoaglin)
+against its merchant's amounts over the history window when the merchant has MIN_HISTORY of them, else
+its category's. Keys with too little history, or with MAD == 0, fall back to the old fixed threshold,
+rescaled so that amount == FALLBACK_THRESHOLD maps to the z cutoff. Only unusually *high* amounts are
+flagged.
+
+This is the one definition of an anomaly: online_stats scores new expenses inline with the same
+constants and `modified_z`, only from its running sketches (all history, quantiles within
+SKETCH_ALPHA) instead of this window, so borderline amounts can still land on different sides.
+"""
+from datetime import date, timedelta
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select, insert, literal_column, Date
+
+import models
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+Z_THRESHOLD = 3.5
+MIN_HISTORY = 8
+FALLBACK_THRESHOLD = 1000.0
+HISTORY_DAYS = 365
+
+
+def modified_z(amount, median, mad):
+    return 0.6745 * (amount - median) / mad
+
+
+def fallback_score(amount):
+    """Score on the fixed-threshold scale: FALLBACK_THRESHOLD maps onto Z_THRESHOLD."""
+    return amount / FALLBACK_THRESHOLD * Z_THRESHOLD
+
+
+def group_stats(keys: "pd.Series", amounts: "pd.Series") -> "pd.DataFrame":
+    """Count, median and MAD of `amounts` per value of `keys`."""
+    import pandas as pd
+
+    amounts = amounts.astype(float)
+    median = amounts.groupby(keys).transform("median")
+    grouped = pd.DataFrame({"key": keys, "amount": amounts, "dev": (amounts - median).abs()}).groupby("key")
+    return pd.DataFrame({"count": grouped["amount"].size(), "median": grouped["amount"].median(), "mad": grouped["dev"].median()})
+
+
+def category_stats(history: "pd.DataFrame") -> "pd.DataFrame":
+    """Per-category stats of `amount`, indexed by category_id (0 = none)."""
+    return group_stats(history["category_id"].fillna(0).astype("int64"), history["amount"])
+
+
+def merchant_stats(history: "pd.DataFrame") -> "pd.DataFrame":
+    """Per-merchant stats of `amount`, indexed by merchant_normalized."""
+    known = history[history["merchant_normalized"].fillna("") != ""]
+    return group_stats(known["merchant_normalized"], known["amount"])
+
+
+def _row_stats(stats: "pd.DataFrame", keys):
+    per_row = stats.reindex(keys)
+    mad = per_row["mad"].to_numpy()
+    return (per_row["count"].fillna(0).to_numpy() >= MIN_HISTORY) & (mad > 0), per_row["median"].to_numpy(), mad
+
+
+def robust_scores(frame: "pd.DataFrame", stats: "pd.DataFrame", merchants: "pd.DataFrame" = None) -> "pd.DataFrame":
+    """Add `median`, `score`, `flagged` and `by_merchant` columns to a frame with `category_id` and `amount`
+    (and `merchant_normalized` when `merchants` stats are given)."""
+    import numpy as np
+
+    amounts = frame["amount"].astype(float).to_numpy()
+    usable, median, mad = _row_stats(stats, frame["category_id"].fillna(0).astype("int64").to_numpy())
+    by_merchant = np.zeros(len(frame), dtype=bool)
+    if merchants is not None:
+        by_merchant, merchant_median, merchant_mad = _row_stats(merchants, frame["merchant_normalized"].to_numpy())
+        median = np.where(by_merchant, merchant_median, median)
+        mad = np.where(by_merchant, merchant_mad, mad)
+        usable = usable | by_merchant
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = modified_z(amounts, median, mad)
+    score = np.where(usable, z, fallback_score(amounts))
+    flagged = np.where(usable, z > Z_THRESHOLD, amounts > FALLBACK_THRESHOLD)
+    return frame.assign(median=np.where(usable, median, np.nan), score=score, flagged=flagged, by_merchant=by_merchant)
+
+
+def scan(db, days: int = 30, history_days: int = HISTORY_DAYS, today: date = None) -> dict:
+    """Score expenses of the last `days` days and log new anomalies. Caller commits."""
+    import pandas as pd
+
+    today = today or date.today()
+    since = today - timedelta(days=days)
+    history_start = min(since, today - timedelta(days=history_days))
+
+    E = models.Expense
+    # history only needs the keys and amounts; the scan window needs ids and merchant names too
+    # the history window covers most of the table, so a sequential scan beats walking ix_expenses_date;
+    # unary "+" is SQLite's way of keeping a column out of index selection
+    unindexed_date = literal_column("+expenses.date", type_=Date)
+    history = pd.DataFrame(db.execute(select(E.category_id, E.merchant_normalized, E.amount).where(unindexed_date >= history_start)).all(),
+                           columns=["category_id", "merchant_normalized", "amount"])
+    window = pd.DataFrame(db.execute(select(E.id, E.category_id, E.merchant, E.merchant_normalized, E.amount).where(E.date >= since)).all(),
+                          columns=["id", "category_id", "merchant", "merchant_normalized", "amount"])
+    if window.empty:
+        return {"scanned": 0, "flagged": 0, "created": 0}
+    window = robust_scores(window, category_stats(history), merchant_stats(history))
+    flagged = window[window["flagged"]]
+
+    # dedupe against existing logs with one set-based query over the scan window
+    existing = {eid for (eid,) in db.execute(
+        select(models.AnomalyLog.expense_id).where(models.AnomalyLog.expense_id.in_(select(E.id).where(E.date >= since)))
+    )}
+    new = flagged[~flagged["id"].isin(existing)]
+
+    if len(new):
+        names = dict(db.execute(select(models.Category.id, models.Category.name)).all())
+
+        def message(r):
+            if pd.isna(r.median):
+                return "Amount above fixed threshold"
+            label = r.merchant if r.by_merchant else names.get(r.category_id) or "uncategorized"
+            return f"Unusually high for {label} (typical {round(float(r.median), 2)})"
+
+        db.execute(insert(models.AnomalyLog), [
+            {
+                "expense_id": int(r.id),
+                "amount": float(r.amount),
+                "category": names.get(r.category_id),
+                "score": round(float(r.score), 3),
+                "message": message(r),
+            }
+            for r in new.itertuples(index=False)
+        ])
+    return {"scanned": int(len(window)), "flagged": int(len(flagged)), "created": int(len(new))}
@@ -0,0 +1,64 @@
+"""/anomalies/scan: per-row Python loop with lazy loads and existence queries vs batch scoring.
+
+    python -m benchmarks.bench_anomaly_scan [n_expenses] [n_legacy]
+"""
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+import anomaly_scoring
+import models
+from benchmarks.common import temp_session, seed_categories, seed_expenses, cleanup
+
+
+def legacy_scan(db, days=30):
+    since = date.today() - timedelta(days=days)
+    created = 0
+    for e in db.query(models.Expense).filter(models.Expense.date >= since).all():
+        if e.amount is not None and e.amount > 1000:  # the old fixed-threshold rule
+            exists = db.query(models.AnomalyLog).filter(models.AnomalyLog.expense_id == e.id).first()
+            if not exists:
+                db.add(models.AnomalyLog(expense_id=e.id, amount=e.amount, category=(e.category.name if e.category else None), score=1.0, message='Automatic anomaly detection'))
+                created += 1
+    db.commit()
+    return created
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, round(time.perf_counter() - t0, 2)
+
+
+def main(n=1_000_000, n_legacy=1_000_000):
+    results = {}
+    for label, size in (("legacy", n_legacy), ("batch", n)):
+        db, engine, path = temp_session()
+        try:
+            cat_ids = seed_categories(db)
+            # one month of scan window inside a year of history, ~1% large outliers
+            seed_expenses(db, size, date.today() - timedelta(days=364), 365, cat_ids)
+            outliers = [{"amount": 5000.0, "date": date.today() - timedelta(days=i % 30), "category_id": cat_ids[i % len(cat_ids)], "merchant": "Outlier"} for i in range(size // 100)]
+            db.execute(insert(models.Expense), outliers)
+            db.commit()
+            if label == "legacy":
+                created, secs = _timed(lambda: legacy_scan(db))
+            else:
+                res, secs = _timed(lambda: anomaly_scoring.scan(db))
+                db.commit()
+                created = res["created"]
+                _, rescan_secs = _timed(lambda: anomaly_scoring.scan(db))
+                results["batch_rescan_s"] = rescan_secs
+            results[f"{label}_expenses"] = size
+            results[f"{label}_s"] = secs
+            results[f"{label}_created"] = created
+        finally:
+            cleanup(db, engine, path)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000, int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
@@ -0,0 +1,55 @@
+"""/budgets/status: one SUM query per budget vs the grouped conditional aggregation.
+
+    python -m benchmarks.bench_budget_status [n_expenses] [n_budgets]
+"""
+import json
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert
+
+import models
+from routes.budgets import _budgets_status, get_date_range
+from benchmarks.common import temp_session, seed_expenses, time_call, capture_sql, cleanup
+
+
+def legacy_status(db):
+    # previous implementation: one aggregate per budget (spent values only)
+    out = []
+    for budget in db.query(models.Budget).all():
+        period_start, period_end = get_date_range(budget.period_type, budget.start_date)
+        query = db.query(func.sum(models.Expense.amount)).filter(models.Expense.date >= period_start, models.Expense.date <= period_end)
+        if budget.category_id:
+            query = query.filter(models.Expense.category_id == budget.category_id)
+        out.append(query.scalar() or 0.0)
+    return out
+
+
+def main(n=1_000_000, n_budgets=200):
+    db, engine, path = temp_session()
+    try:
+        n_cats = n_budgets // 2
+        db.execute(insert(models.Category), [{"name": f"Category {i}", "type": "expense"} for i in range(n_cats)])
+        db.commit()
+        cat_ids = [c for (c,) in db.query(models.Category.id)]
+        seed_expenses(db, n, date.today() - timedelta(days=730), 731, cat_ids)
+        budgets = [{"category_id": c, "amount": 400.0, "period_type": p, "start_date": date.today()} for c in cat_ids for p in ("monthly", "weekly")]
+        budgets[-1]["category_id"] = None  # one overall budget
+        db.execute(insert(models.Budget), budgets[:n_budgets])
+        db.commit()
+
+        new = [round(s.spent, 6) for s in _budgets_status(db)]
+        assert new == [round(s, 6) for s in legacy_status(db)]
+        with capture_sql(engine) as cap:
+            _budgets_status(db)
+
+        print(json.dumps({"expenses": n, "budgets": n_budgets,
+                          "legacy_spent_queries_ms": time_call(lambda: legacy_status(db), repeat=3),
+                          "budgets_status_ms": time_call(lambda: _budgets_status(db), repeat=3),
+                          "budgets_status_statements": len(cap.statements)}, indent=2))
+    finally:
+        cleanup(db, engine, path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000, int(sys.argv[2]) if len(sys.argv) > 2 else 200)
@@ -0,0 +1,47 @@
+"""Back-loading history: per-row create_expense (commit + refresh each) vs BulkWriter.
+
+    python -m benchmarks.bench_bulk_insert [n_rows] [chunk_size]
+"""
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import models, schemas
+from bulk_ingest import BulkWriter
+from routes.expenses import create_expense
+from benchmarks.common import temp_session, seed_categories, cleanup, MERCHANTS
+
+
+def rows(n, cat_ids, seed=3):
+    rnd = random.Random(seed)
+    start = date(2015, 1, 1)
+    for _ in range(n):
+        yield {"amount": round(rnd.uniform(1, 500), 2), "date": (start + timedelta(days=rnd.randrange(3650))).isoformat(),
+               "category_id": rnd.choice(cat_ids), "merchant": rnd.choice(MERCHANTS), "notes": None}
+
+
+def main(n=1_000_000, chunk_size=5000, n_single=2000):
+    db, engine, path = temp_session()
+    try:
+        cat_ids = seed_categories(db)
+
+        t0 = time.perf_counter()
+        for r in rows(n_single, cat_ids):
+            create_expense(schemas.ExpenseCreate(**r), db=db)
+        single_s = (time.perf_counter() - t0) * (n / n_single)
+
+        t0 = time.perf_counter()
+        result = BulkWriter(db, models.Expense, schemas.ExpenseCreate, chunk_size=chunk_size).ingest(rows(n, cat_ids))
+        bulk_s = time.perf_counter() - t0
+        assert result.inserted == n and not result.errors
+
+        print(json.dumps({"rows": n, "chunk_size": chunk_size, "per_row_commit_s_extrapolated": round(single_s, 1),
+                          "bulk_s": round(bulk_s, 1), "bulk_rows_per_s": int(n / bulk_s)}, indent=2))
+    finally:
+        cleanup(db, engine, path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000, int(sys.argv[2]) if len(sys.argv) > 2 else 5000)
@@ -0,0 +1,75 @@
+"""Peak memory and wall time of /reports/export: pandas materialization vs streaming chunks (csv)
+and a DataFrame + ExcelWriter vs the constant-memory workbook (xlsx).
+
+    python -m benchmarks.bench_export [n_expenses]
+"""
+import io
+import json
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+import pandas as pd
+
+import models
+from routes.reports import EXPORT_COLUMNS, _export_rows, _csv_chunks, _ndjson_chunks, _file_chunks, _xlsx_file
+from benchmarks.common import temp_session, seed_categories, seed_expenses, cleanup
+
+
+def legacy_csv(db, start, end):
+    # previous implementation: ORM objects + lazy category per row + DataFrame + StringIO + BytesIO
+    rows = []
+    for e in db.query(models.Expense).filter(models.Expense.date >= start, models.Expense.date <= end).all():
+        rows.append({"date": e.date.isoformat(), "merchant": e.merchant, "category": (e.category.name if e.category else None), "amount": e.amount, "notes": e.notes})
+    df = pd.DataFrame(rows)
+    stream = io.StringIO()
+    df.to_csv(stream, index=False)
+    return len(io.BytesIO(stream.getvalue().encode('utf-8')).getvalue())
+
+
+def legacy_xlsx(db, start, end):
+    # previous implementation: every row in a DataFrame, written by ExcelWriter into a BytesIO
+    df = pd.DataFrame(list(_export_rows(db, start, end, [], None, None, None)), columns=EXPORT_COLUMNS)
+    out = io.BytesIO()
+    with pd.ExcelWriter(out, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Report')
+    return len(out.getvalue())
+
+
+def drain(chunks):
+    return sum(len(c) for c in chunks)
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn()
+    elapsed = (time.perf_counter() - t0) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bytes_out": size, "ms": round(elapsed, 1), "peak_mb": round(peak / 1e6, 2)}
+
+
+def main(n=200_000):
+    db, engine, path = temp_session()
+    try:
+        cat_ids = seed_categories(db)
+        start, end = date(2022, 1, 1), date(2024, 12, 31)
+        seed_expenses(db, n, start, (end - start).days + 1, cat_ids)
+        db.expire_all()
+        results = {
+            "n_expenses": n,
+            "legacy_csv": measure(lambda: legacy_csv(db, start, end)),
+            "streaming_csv": measure(lambda: drain(_csv_chunks(_export_rows(db, start, end, [], None, None, None)))),
+            "streaming_ndjson": measure(lambda: drain(_ndjson_chunks(_export_rows(db, start, end, [], None, None, None)))),
+            "legacy_xlsx": measure(lambda: legacy_xlsx(db, start, end)),
+            "constant_memory_xlsx": measure(lambda: drain(_file_chunks(_xlsx_file(_export_rows(db, start, end, [], None, None, None))))),
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        cleanup(db, engine, path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
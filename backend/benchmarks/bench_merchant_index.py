@@ -0,0 +1,104 @@
+"""Fuzzy merchant lookup: full difflib scan vs MerchantIndex, 100 to 100k saved mappings.
+
+    python -m benchmarks.bench_merchant_index [max_mappings]
+"""
+import difflib
+import json
+import random
+import re
+import sys
+import time
+
+from sqlalchemy import insert
+
+import models
+from merchant_index import MerchantIndex, FUZZY_THRESHOLD
+from normalizer import normalize_merchant
+from benchmarks.common import temp_session, cleanup
+
+WORDS = ["star", "bucks", "coffee", "market", "fresh", "city", "shell", "oil", "amazon", "mktp",
+         "uber", "trip", "whole", "foods", "target", "store", "net", "flix", "gym", "pharma",
+         "burger", "king", "taco", "bell", "metro", "rail", "water", "power", "books", "cafe"]
+
+
+def legacy_best(db, normalized):
+    # previous implementation: score every row, normalizing both stored strings each time
+    def normalize(s):
+        if not s:
+            return ""
+        s = s.lower().strip()
+        s = re.sub(r"#\d+", "", s)
+        s = re.sub(r"\bno\.?\s*\d+\b", "", s)
+        s = re.sub(r"[^a-z0-9\s]", "", s)
+        s = re.sub(r"\s+", " ", s).strip()
+        return s
+
+    def similarity(a, b):
+        if not a or not b:
+            return 0.0
+        return difflib.SequenceMatcher(None, a, b).ratio()
+
+    best, best_score = None, 0.0
+    for m in db.query(models.MerchantMapping).all():
+        score = max(similarity(normalized, normalize(m.merchant or "")), similarity(normalized, normalize(m.canonical or "")))
+        if score > best_score:
+            best_score, best = score, m
+    if best_score >= FUZZY_THRESHOLD:
+        return best.id, best_score
+    return None, 0.0
+
+
+def noisy(rnd, s):
+    i = rnd.randrange(len(s))
+    op = rnd.random()
+    if op < 0.4:
+        return s[:i] + s[i + 1:]
+    if op < 0.8:
+        return s[:i] + rnd.choice("abcdefghijklmnopqrstuvwxyz") + s[i:]
+    return s + f" #{rnd.randint(1, 999)}"
+
+
+def make_names(rnd, n):
+    names = set()
+    while len(names) < n:
+        names.add(" ".join(rnd.sample(WORDS, rnd.randint(1, 3))) + (f" {rnd.randint(1, 99999)}" if rnd.random() < 0.7 else ""))
+    return sorted(names)
+
+
+def run(n, n_queries=50):
+    rnd = random.Random(n)
+    db, engine, path = temp_session()
+    try:
+        names = make_names(rnd, n)
+        db.execute(insert(models.MerchantMapping), [{"merchant": normalize_merchant(x), "canonical": x.title(), "category": "Shopping"} for x in names])
+        db.commit()
+        queries = [normalize_merchant(noisy(rnd, rnd.choice(names))) for _ in range(n_queries)]
+
+        index = MerchantIndex()
+        t0 = time.perf_counter()
+        index.rebuild(db)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        legacy_queries = queries[:max(3, n_queries if n <= 10_000 else 5)]
+        t0 = time.perf_counter()
+        expected = [legacy_best(db, q) for q in legacy_queries]
+        legacy_ms = (time.perf_counter() - t0) * 1000 / len(legacy_queries)
+
+        t0 = time.perf_counter()
+        got = [index.best_match(q) for q in queries]
+        index_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        assert got[:len(expected)] == expected, (got[:len(expected)], expected)
+
+        return {"mappings": n, "index_build_ms": round(build_ms, 1), "legacy_ms_per_lookup": round(legacy_ms, 2),
+                "index_ms_per_lookup": round(index_ms, 3), "hit_rate": round(sum(1 for m, _ in got if m) / len(got), 2)}
+    finally:
+        cleanup(db, engine, path)
+
+
+def main(max_n=100_000):
+    sizes = [n for n in (100, 1_000, 10_000, 100_000) if n <= max_n]
+    print(json.dumps([run(n) for n in sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
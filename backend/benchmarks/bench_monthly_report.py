@@ -0,0 +1,79 @@
+"""Latency of /reports/month: previous per-day SUM loop vs the single grouped daily query.
+
+    python -m benchmarks.bench_monthly_report [n_expenses]
+"""
+import calendar
+import json
+import sys
+from datetime import date
+
+from sqlalchemy import func
+
+import models
+from routes.reports import _monthly_report
+from benchmarks.common import temp_session, seed_categories, seed_expenses, time_call, cleanup
+
+
+def legacy_monthly_report(db, year, month, category_ids=None, merchant=None, min_amount=None, max_amount=None):
+    # previous implementation: full ORM load for the count and one SUM query per calendar day
+    month_start = date(year, month, 1)
+    _, total_days = calendar.monthrange(year, month)
+    month_end = date(year, month, total_days)
+    ids = [int(x) for x in category_ids.split(',') if x.strip().isdigit()] if category_ids else []
+
+    q = db.query(models.Expense).filter(models.Expense.date >= month_start, models.Expense.date <= month_end)
+    if ids:
+        q = q.filter(models.Expense.category_id.in_(ids))
+    if merchant:
+        q = q.filter(models.Expense.merchant.ilike(f"%{merchant}%"))
+    if min_amount is not None:
+        q = q.filter(models.Expense.amount >= min_amount)
+    if max_amount is not None:
+        q = q.filter(models.Expense.amount <= max_amount)
+    expenses = q.all()
+
+    cat_totals = db.query(models.Category.name, func.sum(models.Expense.amount)).join(models.Expense, models.Expense.category_id == models.Category.id).filter(models.Expense.date >= month_start, models.Expense.date <= month_end)
+    if ids:
+        cat_totals = cat_totals.filter(models.Expense.category_id.in_(ids))
+    cat_totals.group_by(models.Category.name).all()
+
+    merchant_rows = db.query(models.Expense.merchant, func.sum(models.Expense.amount)).filter(models.Expense.date >= month_start, models.Expense.date <= month_end)
+    if merchant:
+        merchant_rows = merchant_rows.filter(models.Expense.merchant.ilike(f"%{merchant}%"))
+    merchant_rows.group_by(models.Expense.merchant).order_by(func.sum(models.Expense.amount).desc()).limit(10).all()
+
+    daily = []
+    for d in range(1, total_days + 1):
+        day = date(year, month, d)
+        day_sum = db.query(func.sum(models.Expense.amount)).filter(models.Expense.date == day)
+        if ids:
+            day_sum = day_sum.filter(models.Expense.category_id.in_(ids))
+        daily.append({"date": day.isoformat(), "total": day_sum.scalar() or 0.0})
+    return {"daily_trend": daily, "expenses_count": len(expenses)}
+
+
+def main(n=100_000):
+    db, engine, path = temp_session()
+    try:
+        cat_ids = seed_categories(db)
+        seed_expenses(db, n, date(2024, 3, 1), 31, cat_ids)
+        ids = ",".join(str(i) for i in cat_ids[:4])
+
+        new = _monthly_report(db, 2024, 3, ids)
+        old = legacy_monthly_report(db, 2024, 3, ids)
+        assert new["expenses_count"] == old["expenses_count"]
+        assert [round(x["total"], 6) for x in new["daily_trend"]] == [round(x["total"], 6) for x in old["daily_trend"]]
+
+        results = {
+            "n_expenses": n,
+            "legacy_monthly_report_ms": time_call(lambda: legacy_monthly_report(db, 2024, 3, ids)),
+            "monthly_report_ms": time_call(lambda: _monthly_report(db, 2024, 3, ids)),
+            "monthly_report_all_filters_ms": time_call(lambda: _monthly_report(db, 2024, 3, ids, "uber", 10, 400)),
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        cleanup(db, engine, path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,54 @@
+"""Categorizing a bank statement: one /ai/predict_category call per row vs /ai/predict_category/batch.
+
+    python -m benchmarks.bench_predict_batch [n_rows]
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import insert
+
+import models
+from database import AsyncDB
+from normalizer import normalize_merchant
+from routes.ai import PredictionRequest, predict_category, predict_category_batch
+from benchmarks.common import temp_session, seed_categories, seed_expenses, cleanup, MERCHANTS
+
+
+def main(n=10_000, n_mappings=2_000):
+    rnd = random.Random(7)
+    db, engine, path = temp_session()
+    try:
+        cat_ids = seed_categories(db)
+        seed_expenses(db, 50_000, date.today().replace(day=1), 1, cat_ids)
+        names = [f"{rnd.choice(MERCHANTS)} {i}" for i in range(n_mappings)]
+        db.execute(insert(models.MerchantMapping), [{"merchant": normalize_merchant(x), "canonical": x, "category": "Shopping"} for x in names])
+        db.commit()
+        pool = names[:200] + MERCHANTS + [f"Unknown Vendor {i}" for i in range(300)]
+        reqs = [PredictionRequest(merchant=rnd.choice(pool) + (f" #{rnd.randint(1, 99)}" if rnd.random() < 0.3 else ""), amount=round(rnd.uniform(1, 2000), 2)) for _ in range(n)]
+
+        sample = reqs[:1000]
+
+        async def timed():
+            handle = AsyncDB(db)  # sync session, driven through the threadpool
+            t0 = time.perf_counter()
+            batch = await predict_category_batch(reqs, db=handle)
+            batch_ms = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            single = [await predict_category(r, db=handle) for r in sample]
+            single_ms = (time.perf_counter() - t0) * 1000 * (n / len(sample))
+            assert single == batch[:len(sample)]
+            return batch_ms, single_ms
+
+        batch_ms, single_ms = asyncio.run(timed())
+
+        print(json.dumps({"rows": n, "single_calls_ms_extrapolated": round(single_ms, 1), "batch_ms": round(batch_ms, 1)}, indent=2))
+    finally:
+        cleanup(db, engine, path)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
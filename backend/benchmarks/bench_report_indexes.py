@@ -0,0 +1,84 @@
+"""EXPLAIN QUERY PLAN and timings of the report/budget endpoints without and with the migration indexes.
+
+    python -m benchmarks.bench_report_indexes [sizes ...]      (default: 10000 100000 1000000)
+"""
+import json
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import insert, text
+
+import migrations
+import models
+from routes.reports import _projected_eom, _monthly_report
+from summary_cache import summary_cache
+from routes.budgets import _budgets_status
+from routes.goals import goal_progress
+from benchmarks.common import temp_session, seed_categories, seed_expenses, time_call, capture_sql, explain, cleanup
+
+
+def _index_names():
+    names = []
+    for _, _, steps in migrations.MIGRATIONS:
+        for step in steps:
+            if isinstance(step, str) and step.startswith("CREATE INDEX"):
+                names.append(step.split()[5])
+    return names
+
+
+def _endpoints(db, cat_ids, goal_id):
+    today = date.today()
+    return {
+        "reports/summary": lambda: summary_cache.totals(db),
+        "reports/projected_eom": lambda: _projected_eom(db),
+        "reports/month": lambda: _monthly_report(db, today.year, today.month, str(cat_ids[0])),
+        "budgets/status": lambda: _budgets_status(db),
+        "goals/progress": lambda: goal_progress(goal_id, db=db),
+    }
+
+
+def _measure(engine, endpoints):
+    out = {}
+    for name, fn in endpoints.items():
+        with capture_sql(engine) as cap:
+            fn()
+        plans = {}
+        for stmt, params in cap.statements:
+            if stmt.lstrip().upper().startswith("SELECT") and "expenses" in stmt:
+                plans.setdefault(" ".join(stmt.split())[:160], explain(engine, stmt, params))
+        out[name] = {"ms": time_call(fn, repeat=3), "statements": len(cap.statements), "plans": list(plans.values())}
+    return out
+
+
+def run(n):
+    db, engine, path = temp_session()
+    try:
+        cat_ids = seed_categories(db)
+        start = date.today() - timedelta(days=3 * 365)
+        seed_expenses(db, n, start, 3 * 365 + 1, cat_ids)
+        db.execute(insert(models.Budget), [{"category_id": c, "amount": 500.0, "period_type": p, "start_date": start} for c in cat_ids for p in ("monthly", "weekly")])
+        db.add(models.Goal(name="Bench", target_amount=10000.0, deadline=date.today() + timedelta(days=365)))
+        db.commit()
+        goal_id = db.query(models.Goal.id).scalar()
+
+        with engine.begin() as conn:
+            for name in _index_names():
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            conn.execute(text("ANALYZE"))
+        before = _measure(engine, _endpoints(db, cat_ids, goal_id))
+
+        migrations.apply_migrations(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        after = _measure(engine, _endpoints(db, cat_ids, goal_id))
+        return {"rows": n, "without_indexes": before, "with_indexes": after}
+    finally:
+        cleanup(db, engine, path)
+
+
+def main(sizes):
+    print(json.dumps([run(n) for n in sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
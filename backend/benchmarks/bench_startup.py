@@ -0,0 +1,106 @@
+"""Worker cold start: what importing main costs now vs the schema/seed/backfill work it used to do.
+
+    python -m benchmarks.bench_startup [--years 2] [--runs 5]
+
+Builds a synthetic database, times the one-off ``migrations.bootstrap`` (fresh, then with nothing
+pending), the steps every worker used to run at import on that same database, a cold
+``import main`` in a fresh interpreter, and spawn-to-first-response of ``uvicorn main:app``.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+import migrations
+import models
+from database import Base
+from benchmarks.common import temp_session, cleanup
+from benchmarks.load_sqlite_profiles import _free_port, _wait_ready
+from benchmarks.synthetic import generate
+
+IMPORT_MAIN = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def legacy_startup(engine):
+    """The import-time steps main.py used to run in every worker (with the missing datetime import fixed)."""
+    Base.metadata.create_all(bind=engine)
+    migrations.apply_migrations(engine)
+    with Session(bind=engine) as db:
+        if db.query(models.Category).count() == 0:
+            db.add_all(models.Category(name=n, type=t) for n, t in migrations.DEFAULT_CATEGORIES)
+            db.commit()
+    with Session(bind=engine) as db:
+        for g in db.query(models.Goal).all():
+            if g.created_at is None:
+                contrib = db.query(models.GoalContribution).filter(models.GoalContribution.goal_id == g.id).order_by(models.GoalContribution.date).first()
+                g.created_at = contrib.date if contrib and contrib.date else datetime.utcnow()
+        db.commit()
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _median_ms(samples):
+    return round(statistics.median(samples) * 1000, 1)
+
+
+def run(years, runs):
+    db, engine, path = temp_session()
+    try:
+        data = generate(db, years=years)
+        db.close()
+        fresh = _timed(lambda: migrations.bootstrap(engine))
+        current = [_timed(lambda: migrations.bootstrap(engine)) for _ in range(runs)]
+        legacy = [_timed(lambda: legacy_startup(engine)) for _ in range(runs)]
+        engine.dispose()
+
+        env = dict(os.environ, FINANCE_DATABASE_URL=f"sqlite:///{path}")
+        imports = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", IMPORT_MAIN], env=env, capture_output=True, text=True, check=True).stdout
+            imports.append(float(out.strip().splitlines()[-1]))
+
+        first_response = []
+        for _ in range(runs):
+            port = _free_port()
+            t0 = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                                    env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _wait_ready(f"http://127.0.0.1:{port}")
+                first_response.append(time.perf_counter() - t0)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+        return {
+            "data": data,
+            "bootstrap_fresh_ms": round(fresh * 1000, 1),
+            "bootstrap_nothing_pending_ms": _median_ms(current),
+            "legacy_per_worker_startup_steps_ms": _median_ms(legacy),
+            "import_main_ms": _median_ms(imports),
+            "uvicorn_first_response_ms": _median_ms(first_response),
+        }
+    finally:
+        cleanup(db, engine, path)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=float, default=2)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    print(json.dumps(run(args.years, args.runs), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks never touch ``finance.db``: every run builds a throwaway SQLite file
+in a temp directory and calls the route functions directly with a session bound to it.
+Run them from ``backend/`` with ``python -m benchmarks.<name>``.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+import models
+import rollups
+
+
+MERCHANTS = [
+    "Starbucks #1123", "Uber Trip", "Amazon Mktp", "Netflix.com", "Whole Foods",
+    "Shell Oil 5521", "City Water Co", "Spotify", "Target Store No. 44", "Local Diner",
+]
+
+
+def temp_session():
+    """Return (session, engine, path) for a fresh SQLite database in a temp dir."""
+    fd, path = tempfile.mkstemp(prefix="finance_bench_", suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return Session(), engine, path
+
+
+def seed_categories(db, n=8):
+    rows = [{"name": f"Category {i}", "type": "expense"} for i in range(n)]
+    db.execute(insert(models.Category), rows)
+    db.commit()
+    return [c.id for c in db.query(models.Category).all()]
+
+
+def seed_expenses(db, n, start: date, days: int, category_ids, seed=42, chunk=10000):
+    """Bulk insert ``n`` expenses spread uniformly over ``days`` days from ``start``."""
+    rnd = random.Random(seed)
+    batch = []
+    for _ in range(n):
+        batch.append({
+            "amount": round(rnd.uniform(1, 500), 2),
+            "date": start + timedelta(days=rnd.randrange(days)),
+            "category_id": rnd.choice(category_ids),
+            "merchant": rnd.choice(MERCHANTS),
+            "notes": None,
+        })
+        if len(batch) >= chunk:
+            db.execute(insert(models.Expense), batch)
+            batch = []
+    if batch:
+        db.execute(insert(models.Expense), batch)
+    rollups.rebuild(db)
+    db.commit()
+
+
+def time_call(fn, repeat=5):
+    """Run ``fn`` ``repeat`` times and return the median wall time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def cleanup(db, engine, path):
+    db.close()
+    engine.dispose()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class capture_sql:
+    """Context manager recording (statement, parameters) for every cursor execute on ``engine``."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+
+def explain(engine, statement, parameters):
+    """EXPLAIN QUERY PLAN rows (detail strings) for a captured SQLite statement."""
+    with engine.connect() as conn:
+        raw = conn.connection.driver_connection
+        return [row[-1] for row in raw.execute("EXPLAIN QUERY PLAN " + statement, parameters or ()).fetchall()]
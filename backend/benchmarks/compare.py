@@ -0,0 +1,45 @@
+"""Diff two benchmarks.suite JSON results.
+
+    python -m benchmarks.compare before.json after.json [--threshold 0.1]
+
+Prints one line per case with old/new medians and the ratio, flagging changes beyond the threshold.
+"""
+import argparse
+import json
+
+
+def _rows(result):
+    for name, r in result.get("routes", {}).items():
+        yield name, r["median_ms"], "ms"
+    for name, r in result.get("functions", {}).items():
+        yield name, r["median_us_per_call"], "us"
+
+
+def compare(old: dict, new: dict, threshold: float = 0.1) -> str:
+    before = {name: (value, unit) for name, value, unit in _rows(old)}
+    lines = [f"{'case':44} {'old':>10} {'new':>10} {'ratio':>7}"]
+    for name, value, unit in sorted(_rows(new)):
+        if name not in before:
+            lines.append(f"{name:44} {'-':>10} {value:>8.3f}{unit} {'new':>7}")
+            continue
+        old_value = before.pop(name)[0]
+        ratio = value / old_value if old_value else float("inf")
+        flag = "  slower" if ratio > 1 + threshold else "  faster" if ratio < 1 - threshold else ""
+        lines.append(f"{name:44} {old_value:>8.3f}{unit} {value:>8.3f}{unit} {ratio:>7.2f}{flag}")
+    for name, (value, unit) in sorted(before.items()):
+        lines.append(f"{name:44} {value:>8.3f}{unit} {'-':>10} {'gone':>7}")
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("old")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=0.1)
+    args = ap.parse_args()
+    with open(args.old) as f, open(args.new) as g:
+        print(compare(json.load(f), json.load(g), args.threshold))
+
+
+if __name__ == "__main__":
+    main()
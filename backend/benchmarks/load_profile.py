@@ -0,0 +1,166 @@
+"""HTTP load profile: dashboard polling mixed with ingestion against a real uvicorn server.
+
+Seeds a synthetic database (benchmarks.synthetic), starts ``uvicorn main:app`` on it and runs two
+kinds of clients for a fixed time. Pollers loop over the requests a dashboard makes on page load;
+ingesters post single expenses, bulk ndjson batches and category predictions like a statement
+import does. Prints per-operation latency percentiles and throughput as JSON, which can be diffed
+between versions.
+
+    python -m benchmarks.load_profile [--pollers 8] [--ingesters 2] [--seconds 20] [--workers 1] [--profile production] [--db-mode async]
+
+Run it once with ``--db-mode sync`` and once with ``--db-mode async`` to compare the two ways the hot
+read endpoints reach the database (FINANCE_DB_MODE).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import date
+
+import migrations
+import models
+from benchmarks.common import temp_session, cleanup
+from benchmarks.load_sqlite_profiles import _free_port, _wait_ready
+from benchmarks.synthetic import generate, noisy, merchant_names
+
+DASHBOARD = [
+    ("summary", "GET", "/reports/summary"),
+    ("month", "GET", "/reports/month"),
+    ("projected_eom", "GET", "/reports/projected_eom"),
+    ("budgets_status", "GET", "/budgets/status"),
+    ("goals", "GET", "/goals/"),
+    ("goals_progress", "GET", "/goals/progress"),
+    ("anomalies", "GET", "/anomalies/"),
+    ("reminders_due", "GET", "/reminders/due"),
+    ("expenses_page", "GET", "/expenses/?limit=50"),
+]
+BULK_ROWS = 200
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(len(samples) * q))], 2)
+    return {"count": len(samples), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "mean_ms": round(statistics.fmean(samples), 2)}
+
+
+def _drive(base, seconds, pollers, ingesters, category_id, merchants, seed):
+    latencies, errors = {}, {}
+    lock = threading.Lock()
+    stop = time.time() + seconds
+
+    def call(op, method, path, body=None, content_type="application/json"):
+        req = urllib.request.Request(base + path, data=body, method=method, headers={"content-type": content_type} if body else {})
+        t0 = time.perf_counter()
+        try:
+            urllib.request.urlopen(req, timeout=60).read()
+            ok = True
+        except Exception:
+            ok = False
+        ms = (time.perf_counter() - t0) * 1000
+        with lock:
+            if ok:
+                latencies.setdefault(op, []).append(ms)
+            else:
+                errors[op] = errors.get(op, 0) + 1
+
+    def poller(i):
+        n = i
+        while time.time() < stop:
+            op, method, path = DASHBOARD[n % len(DASHBOARD)]
+            call(op, method, path)
+            n += 1
+
+    def ingester(i):
+        rnd = random.Random(seed + i)
+        today = date.today().isoformat()
+        n = 0
+        while time.time() < stop:
+            kind = n % 10
+            if kind < 6:
+                body = {"amount": round(rnd.uniform(3, 120), 2), "date": today, "category_id": category_id, "merchant": noisy(rnd.choice(merchants), rnd)}
+                call("create_expense", "POST", "/expenses/", json.dumps(body).encode())
+            elif kind < 9:
+                body = {"merchant": noisy(rnd.choice(merchants), rnd), "amount": round(rnd.uniform(3, 120), 2)}
+                call("predict_category", "POST", "/ai/predict_category", json.dumps(body).encode())
+            else:
+                rows = "\n".join(json.dumps({"amount": round(rnd.uniform(3, 120), 2), "date": today, "category_id": category_id,
+                                             "merchant": noisy(rnd.choice(merchants), rnd)}) for _ in range(BULK_ROWS))
+                call("bulk_ndjson", "POST", "/expenses/bulk", rows.encode(), "application/x-ndjson")
+            n += 1
+
+    threads = [threading.Thread(target=poller, args=(i,)) for i in range(pollers)] + \
+              [threading.Thread(target=ingester, args=(i,)) for i in range(ingesters)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ops = {op: _percentiles(samples) | {"errors": errors.get(op, 0)} for op, samples in sorted(latencies.items())}
+    for op, n in errors.items():
+        ops.setdefault(op, {"count": 0, "errors": n})
+    total = sum(len(s) for s in latencies.values())
+    return {"operations": ops, "requests_per_s": round(total / seconds, 1), "errors": sum(errors.values())}
+
+
+def run(years, merchants, seconds, pollers, ingesters, workers, profile, seed, db_mode="sync"):
+    db, engine, path = temp_session()
+    try:
+        data = generate(db, years=years, merchants=merchants, seed=seed)
+        category_id = db.query(models.Category.id).filter(models.Category.type == "expense").order_by(models.Category.id).first()[0]
+        db.close()
+        migrations.bootstrap(engine)  # what a deploy runs before starting the workers
+        engine.dispose()
+        port = _free_port()
+        env = dict(os.environ, FINANCE_DATABASE_URL=f"sqlite:///{path}", FINANCE_DB_PROFILE=profile, FINANCE_DB_MODE=db_mode,
+                   FINANCE_RECURRING_DETECT_MINUTES="0")  # no background detection in the measurements
+        proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+                                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            _wait_ready(base)
+            names = merchant_names(merchants, random.Random(seed))
+            result = _drive(base, seconds, pollers, ingesters, category_id, names, seed)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        return {"meta": {"data": data, "seconds": seconds, "pollers": pollers, "ingesters": ingesters,
+                         "workers": workers, "profile": profile, "db_mode": db_mode}} | result
+    finally:
+        cleanup(db, engine, path)
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=float, default=2)
+    ap.add_argument("--merchants", type=int, default=300)
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--pollers", type=int, default=8)
+    ap.add_argument("--ingesters", type=int, default=2)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--profile", default="production")
+    ap.add_argument("--db-mode", choices=["async", "sync"], default="sync")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+    result = run(args.years, args.merchants, args.seconds, args.pollers, args.ingesters, args.workers, args.profile, args.seed, args.db_mode)
+    text = json.dumps(result, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
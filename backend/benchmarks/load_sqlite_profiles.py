@@ -0,0 +1,121 @@
+"""Concurrent read/write throughput of the API under each FINANCE_DB_PROFILE and uvicorn worker count.
+
+Starts ``uvicorn main:app --workers N`` against a fresh temp database per run, then drives it with
+reader threads (dashboard polls) and writer threads (expense inserts) for a fixed duration.
+
+    python -m benchmarks.load_sqlite_profiles [--workers 1 4] [--profiles default production] [--seconds 10]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date
+
+import migrations
+from benchmarks.common import temp_session, seed_categories, seed_expenses, cleanup
+
+READ_PATHS = ["/reports/summary", "/expenses/?limit=50", "/budgets/status", "/reports/month"]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base + "/", timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def _drive(base, seconds, readers, writers, category_id):
+    stats = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.time() + seconds
+
+    def reader(i):
+        n = 0
+        while time.time() < stop:
+            try:
+                urllib.request.urlopen(base + READ_PATHS[(i + n) % len(READ_PATHS)], timeout=30).read()
+                key = "reads"
+            except Exception:
+                key = "errors"
+            n += 1
+            with lock:
+                stats[key] += 1
+
+    def writer(i):
+        body = json.dumps({"amount": 12.5, "date": date.today().isoformat(), "category_id": category_id, "merchant": f"Load {i}"}).encode()
+        while time.time() < stop:
+            req = urllib.request.Request(base + "/expenses/", data=body, headers={"content-type": "application/json"})
+            try:
+                urllib.request.urlopen(req, timeout=30).read()
+                key = "writes"
+            except Exception:
+                key = "errors"
+            with lock:
+                stats[key] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)] + [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {k: v for k, v in stats.items()} | {"reads_per_s": round(stats["reads"] / seconds, 1), "writes_per_s": round(stats["writes"] / seconds, 1)}
+
+
+def run(profile, workers, seconds, readers, writers, seed_rows):
+    db, engine, path = temp_session()
+    try:
+        cat_ids = seed_categories(db)
+        seed_expenses(db, seed_rows, date.today().replace(day=1), 28, cat_ids)
+        db.close()
+        migrations.bootstrap(engine)  # what a deploy runs before starting the workers
+        engine.dispose()
+        port = _free_port()
+        env = dict(os.environ, FINANCE_DATABASE_URL=f"sqlite:///{path}", FINANCE_DB_PROFILE=profile,
+                   FINANCE_RECURRING_DETECT_MINUTES="0")  # no background detection in the measurements
+        proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+                                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            _wait_ready(base)
+            return {"profile": profile, "workers": workers} | _drive(base, seconds, readers, writers, cat_ids[0])
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    finally:
+        cleanup(db, engine, path)
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    ap.add_argument("--profiles", nargs="+", default=["default", "production"])
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--readers", type=int, default=16)
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--seed-rows", type=int, default=50_000)
+    args = ap.parse_args()
+    results = [run(p, w, args.seconds, args.readers, args.writers, args.seed_rows) for p in args.profiles for w in args.workers]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Micro-benchmarks for every API route and every ai_service function, written as diffable JSON.
+
+Builds a synthetic database (benchmarks.synthetic) in a temp file, mounts all routers on an app with
+`get_db` and `get_async_db` (in the chosen ``--db-mode``) pointed at it, and times each case through FastAPI's TestClient: routing, validation,
+handler and serialization, without a network hop. Write cases get fresh targets from a setup step
+that is not timed. Routes without a case are listed under "uncovered", so new endpoints show up.
+
+    python -m benchmarks.suite --out before.json
+    python -m benchmarks.suite --out after.json --compare before.json
+"""
+import argparse
+import contextlib
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import date, timedelta
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+import ai_service
+import models
+from database import async_db_dependency, async_url, get_async_db, get_db
+from routes import expenses, income, categories, reports, ai, budgets, goals, anomalies, reminders, admin
+from benchmarks.common import temp_session, cleanup
+from benchmarks.synthetic import generate, noisy, merchant_names
+from benchmarks.compare import compare
+
+ROUTERS = [expenses, income, categories, reports, ai, budgets, goals, anomalies, reminders, admin]
+
+
+class Case:
+    """One timed request. `setup(ctx)` runs untimed before each call and may return request overrides."""
+
+    def __init__(self, name, method, url, json=None, params=None, setup=None, content=None, headers=None):
+        self.name, self.method, self.url = name, method, url
+        self.json, self.params, self.setup = json, params, setup
+        self.content, self.headers = content, headers
+
+    def request(self, client, ctx):
+        spec = {"url": self.url, "json": self.json, "params": self.params, "content": self.content, "headers": self.headers}
+        if self.setup:
+            spec.update(self.setup(ctx) or {})
+        url = spec.pop("url").format(**ctx)
+        return lambda: client.request(self.method, url, **{k: v for k, v in spec.items() if v is not None})
+
+
+def _new_expense(client, ctx):
+    r = client.post("/expenses/", json={"amount": 10.0, "date": ctx["today"], "category_id": ctx["category_id"], "merchant": "Bench Cafe"})
+    return r.json()["id"]
+
+
+def _new_income(client, ctx):
+    r = client.post("/income/", json={"amount": 10.0, "date": ctx["today"], "category_id": ctx["income_category_id"], "source": "Bench"})
+    return r.json()["id"]
+
+
+def build_cases(client, ctx):
+    today = ctx["today"]
+    cid = ctx["category_id"]
+    counter = iter(range(10 ** 9))
+    expense_body = {"amount": 42.5, "date": today, "category_id": cid, "merchant": "STARBUCKS #1123", "notes": None}
+    bulk_rows = [{"amount": 5 + i % 50, "date": today, "category_id": cid, "merchant": f"Bulk Merchant {i % 40}"} for i in range(500)]
+    bulk_ndjson = "\n".join(json.dumps(r) for r in bulk_rows)
+    batch = [{"merchant": m, "amount": 20.0} for m in ctx["statement_merchants"][:500]]
+
+    def new_category(_):
+        return {"json": {"name": f"Bench category {next(counter)}", "type": "expense"}}
+
+    def merge(ctx):
+        src = client.post("/categories/", json={"name": f"Merge source {next(counter)}", "type": "expense"}).json()["id"]
+        tgt = client.post("/categories/", json={"name": f"Merge target {next(counter)}", "type": "expense"}).json()["id"]
+        return {"json": {"source_id": src, "target_id": tgt}}
+
+    def fresh(create, key):
+        def setup(ctx):
+            ctx[key] = create(client, ctx)
+        return setup
+
+    def new_budget(ctx):
+        ctx["budget_id"] = client.post("/budgets/", json={"amount": 100, "period_type": "monthly", "start_date": today, "category_id": cid}).json()["id"]
+
+    def new_goal(ctx):
+        ctx["goal_tmp_id"] = client.post("/goals/", json={"name": "Bench goal", "target_amount": 1000}).json()["id"]
+
+    def new_reminder(ctx):
+        ctx["reminder_id"] = client.post("/reminders/", json={"title": "Bench", "due_date": today}).json()["id"]
+
+    def first_anomaly(ctx):
+        ctx["anomaly_id"] = client.get("/anomalies/", params={"include_dismissed": True}).json()[0]["id"]
+
+    return [
+        Case("expenses.create", "POST", "/expenses/", json=expense_body),
+        Case("expenses.bulk_json_500", "POST", "/expenses/bulk", json=bulk_rows),
+        Case("expenses.bulk_ndjson_500", "POST", "/expenses/bulk", content=bulk_ndjson, headers={"content-type": "application/x-ndjson"}),
+        Case("expenses.list_100", "GET", "/expenses/", params={"limit": 100}),
+        Case("expenses.list_deep_offset", "GET", "/expenses/", params={"limit": 100, "skip": ctx["deep_offset"]}),
+        Case("expenses.list_fields", "GET", "/expenses/", params={"limit": 100, "fields": "id,date,amount,merchant"}),
+        Case("expenses.list_merchant_filter", "GET", "/expenses/", params={"limit": 100, "merchant": "market"}),
+        Case("expenses.update", "PUT", "/expenses/{expense_id}", json=expense_body, setup=fresh(_new_expense, "expense_id")),
+        Case("expenses.delete", "DELETE", "/expenses/{expense_id}", setup=fresh(_new_expense, "expense_id")),
+        Case("income.create", "POST", "/income/", json={"amount": 100.0, "date": today, "category_id": ctx["income_category_id"], "source": "Bench"}),
+        Case("income.bulk_json_500", "POST", "/income/bulk", json=[{"amount": 100.0, "date": today, "category_id": ctx["income_category_id"], "source": "Bulk"}] * 500),
+        Case("income.list_100", "GET", "/income/", params={"limit": 100}),
+        Case("income.update", "PUT", "/income/{income_id}", json={"amount": 99.0, "date": today, "category_id": ctx["income_category_id"], "source": "Bench"},
+             setup=fresh(_new_income, "income_id")),
+        Case("income.delete", "DELETE", "/income/{income_id}", setup=fresh(_new_income, "income_id")),
+        Case("categories.create", "POST", "/categories/", setup=new_category),
+        Case("categories.list", "GET", "/categories/"),
+        Case("categories.update", "PUT", "/categories/{category_id}", json={"name": "Groceries", "type": "expense"}),
+        Case("categories.merge", "POST", "/categories/merge", setup=merge),
+        Case("reports.summary", "GET", "/reports/summary"),
+        Case("reports.projected_eom", "GET", "/reports/projected_eom"),
+        Case("reports.month", "GET", "/reports/month"),
+        Case("reports.month_filtered", "GET", "/reports/month", params={"merchant": "market", "min_amount": 10}),
+        Case("reports.export_csv_year", "GET", "/reports/export", params={"format": "csv", "start_date": ctx["year_ago"], "end_date": today}),
+        Case("reports.export_xlsx_month", "GET", "/reports/export", params={"format": "xlsx"}),
+        Case("ai.predict_category", "POST", "/ai/predict_category", setup=lambda ctx: {"json": {"merchant": random.choice(ctx["statement_merchants"]), "amount": 25.0}}),
+        Case("ai.predict_category_batch_500", "POST", "/ai/predict_category/batch", json=batch),
+        Case("ai.recurring_check", "POST", "/ai/recurring_check", json={"merchant": "Netflix.com"}),
+        Case("ai.recurring_detect", "POST", "/ai/recurring/detect", params={"wait": True}),
+        Case("ai.recurring_confirm", "POST", "/ai/recurring_confirm", json={"merchant": "Spotify", "interval_days": 30}),
+        Case("ai.confirm_category", "POST", "/ai/confirm_category", setup=lambda ctx: {"json": {"merchant": f"Bench Shop {next(counter)}", "category": "Shopping"}}),
+        Case("budgets.create", "POST", "/budgets/", json={"amount": 100, "period_type": "monthly", "start_date": today, "category_id": cid}),
+        Case("budgets.update", "PUT", "/budgets/{budget_id}", json={"amount": 150, "period_type": "monthly", "start_date": today, "category_id": cid}, setup=new_budget),
+        Case("budgets.delete", "DELETE", "/budgets/{budget_id}", setup=new_budget),
+        Case("budgets.list", "GET", "/budgets/"),
+        Case("budgets.status", "GET", "/budgets/status"),
+        Case("goals.create", "POST", "/goals/", json={"name": "Bench goal", "target_amount": 1000}),
+        Case("goals.list", "GET", "/goals/"),
+        Case("goals.get", "GET", "/goals/{goal_id}"),
+        Case("goals.update", "PUT", "/goals/{goal_id}", json={"name": "Emergency fund", "target_amount": 15000}),
+        Case("goals.add", "POST", "/goals/{goal_id}/add", json=25.0),
+        Case("goals.progress", "GET", "/goals/{goal_id}/progress"),
+        Case("goals.progress_all", "GET", "/goals/progress"),
+        Case("goals.delete", "DELETE", "/goals/{goal_tmp_id}", setup=new_goal),
+        Case("anomalies.list", "GET", "/anomalies/"),
+        Case("anomalies.scan_30d", "POST", "/anomalies/scan"),
+        Case("anomalies.dismiss", "POST", "/anomalies/{anomaly_id}/dismiss", setup=first_anomaly),
+        Case("anomalies.snooze", "POST", "/anomalies/{anomaly_id}/snooze", setup=first_anomaly),
+        Case("reminders.create", "POST", "/reminders/", json={"title": "Bench", "due_date": today}),
+        Case("reminders.list", "GET", "/reminders/"),
+        Case("reminders.dismiss", "POST", "/reminders/{reminder_id}/dismiss", setup=new_reminder),
+        Case("reminders.snooze", "POST", "/reminders/{reminder_id}/snooze", setup=new_reminder),
+        Case("reminders.due", "GET", "/reminders/due"),
+        Case("admin.slow_queries", "GET", "/admin/slow_queries"),
+        Case("admin.clear_slow_queries", "DELETE", "/admin/slow_queries"),
+    ]
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+        "runs": len(samples),
+    }
+
+
+def time_case(client, case, ctx, repeat, warmup=1):
+    samples, status = [], None
+    for i in range(warmup + repeat):
+        call = case.request(client, ctx)
+        t0 = time.perf_counter()
+        response = call()
+        elapsed = (time.perf_counter() - t0) * 1000
+        status = response.status_code
+        if status >= 400:
+            raise RuntimeError(f"{case.name}: HTTP {status} {response.text[:200]}")
+        if i >= warmup:
+            samples.append(elapsed)
+    return _summary(samples) | {"status": status}
+
+
+def time_function(fn, args_list, repeat):
+    """Per-call cost of `fn` over a fixed list of argument tuples, in microseconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for args in args_list:
+            fn(*args)
+        samples.append((time.perf_counter() - t0) * 1e6 / len(args_list))
+    return {"median_us_per_call": round(statistics.median(samples), 3), "calls": len(args_list), "runs": repeat}
+
+
+def uncovered(cases):
+    """Routes of ROUTERS that no case exercises, as "METHOD /path"."""
+    covered = {(c.method, c.url.replace("{goal_tmp_id}", "{goal_id}")) for c in cases}
+    return sorted(
+        f"{method} {route.path}"
+        for module in ROUTERS for route in module.router.routes if isinstance(route, APIRoute)
+        for method in route.methods if (method, route.path) not in covered
+    )
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(years, merchants, per_day, repeat, seed, only=None, db_mode="sync"):
+    warnings.filterwarnings("ignore")
+    random.seed(seed)
+    db, engine, path = temp_session()
+    try:
+        t0 = time.perf_counter()
+        data = generate(db, years=years, merchants=merchants, expenses_per_day=per_day, seed=seed)
+        generate_s = time.perf_counter() - t0
+
+        app = FastAPI()
+        for module in ROUTERS:
+            app.include_router(module.router)
+
+        def override():
+            session = Session(bind=engine)
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app.dependency_overrides[get_db] = override
+        async_engine = create_async_engine(async_url(str(engine.url))) if db_mode == "async" else None
+        app.dependency_overrides[get_async_db] = async_db_dependency(engine, async_engine)
+        # one event loop for all requests, so pooled aiosqlite connections stay usable
+        with TestClient(app) as client:
+            today = date.today()
+            rnd = random.Random(seed)
+            names = merchant_names(merchants, random.Random(seed))
+            ctx = {
+                "today": today.isoformat(),
+                "year_ago": (today - timedelta(days=365)).isoformat(),
+                "category_id": db.query(models.Category.id).filter(models.Category.type == "expense").order_by(models.Category.id).first()[0],
+                "income_category_id": db.query(models.Category.id).filter(models.Category.type == "income").order_by(models.Category.id).first()[0],
+                "goal_id": db.query(models.Goal.id).order_by(models.Goal.id).first()[0],
+                "deep_offset": max(0, data["expenses"] - 200),
+                "statement_merchants": [noisy(rnd.choice(names), rnd) for _ in range(2000)],
+            }
+            db.close()
+            client.post("/anomalies/scan")  # so dismiss/snooze have targets
+
+            cases = build_cases(client, ctx)
+            results = {}
+            for case in cases:
+                if only and not any(o in case.name for o in only):
+                    continue
+                results[case.name] = time_case(client, case, ctx, repeat)
+
+            statements = [(m, "") for m in ctx["statement_merchants"]]
+            functions = {
+                "ai_service.predict_category": time_function(ai_service.predict_category, statements, repeat),
+                "ai_service.predict_with_confidence": time_function(ai_service.predict_with_confidence, statements, repeat),
+            }
+            return {
+                "meta": {
+                    "revision": _git_revision(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "data": data,
+                    "generate_s": round(generate_s, 2),
+                    "repeat": repeat,
+                    "db_mode": db_mode,
+                },
+                "routes": results,
+                "functions": functions,
+                "uncovered": uncovered(cases),
+            }
+    finally:
+        cleanup(db, engine, path)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=float, default=2)
+    ap.add_argument("--merchants", type=int, default=300)
+    ap.add_argument("--per-day", type=float, default=12)
+    ap.add_argument("--repeat", type=int, default=15)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--only", nargs="*", help="substrings of case names to run")
+    ap.add_argument("--db-mode", choices=["async", "sync"], default="sync")
+    ap.add_argument("--out", help="write JSON here instead of stdout")
+    ap.add_argument("--compare", help="earlier JSON result to diff against")
+    args = ap.parse_args()
+    with contextlib.redirect_stdout(sys.stderr):  # some handlers print; keep stdout pure JSON
+        result = run(args.years, args.merchants, args.per_day, args.repeat, args.seed, args.only, args.db_mode)
+    text = json.dumps(result, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Deterministic synthetic finance data for benchmarks.
+
+The same arguments (and seed) always produce the same rows, so results from two versions of the code
+can be compared. Merchants are drawn from a vocabulary and written the way bank statements write
+them: inconsistent case, store numbers, payment-processor prefixes, city suffixes. Each merchant has
+its own category and amount distribution, a share of them are monthly subscriptions with a fixed
+price, and income comes from salary, interest and occasional freelance streams.
+
+    from benchmarks.synthetic import generate
+    summary = generate(db, years=3, categories=12, merchants=400)
+
+``python -m benchmarks.synthetic --years 1`` prints the summary for a throwaway database.
+"""
+import argparse
+import json
+import math
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+import models
+import online_stats
+import recurring_detection
+import rollups
+from normalizer import normalize_merchant
+
+EXPENSE_CATEGORIES = [
+    "Groceries", "Rent", "Utilities", "Transport", "Food & Drink", "Shopping", "Entertainment",
+    "Health", "Travel", "Subscriptions", "Education", "Home", "Insurance", "Gifts", "Pets", "Fees",
+]
+INCOME_CATEGORIES = ["Salary", "Interest", "Freelance"]
+
+_FIRST = ["Green", "Blue", "Golden", "City", "Corner", "Sunny", "River", "Metro", "Urban", "Prime",
+          "Happy", "North", "Royal", "Fresh", "Silver", "Oak", "Star", "Lucky", "Grand", "Summit"]
+_SECOND = ["Leaf", "Bay", "Harbor", "Valley", "Point", "Bridge", "Garden", "Peak", "Lane", "Field"]
+_KIND = ["Market", "Cafe", "Pharmacy", "Fuel", "Books", "Diner", "Outfitters", "Hardware", "Cinema",
+         "Taxi", "Clinic", "Bakery", "Electronics", "Pet Supply", "Airlines", "Hotel", "Gym", "Deli"]
+_SUBSCRIPTIONS = ["Netflix.com", "Spotify", "Hulu", "Dropbox", "Adobe", "iCloud Storage", "NYTimes",
+                  "Duolingo", "Audible", "GitHub", "Xbox Live", "Disney Plus"]
+_PROCESSORS = ["SQ *", "TST* ", "PAYPAL *", "POS ", "CHECKCARD ", ""]
+_CITIES = ["SEATTLE WA", "AUSTIN TX", "NEW YORK NY", "DENVER CO", "BOSTON MA", "SAN JOSE CA"]
+
+
+def merchant_names(n: int, rnd: random.Random):
+    """`n` distinct base merchant names, subscriptions first."""
+    names = list(_SUBSCRIPTIONS[:max(1, n // 10)])
+    seen = set(names)
+    while len(names) < n:
+        name = f"{rnd.choice(_FIRST)} {rnd.choice(_SECOND)} {rnd.choice(_KIND)}"
+        if name in seen:
+            name = f"{name} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def noisy(name: str, rnd: random.Random) -> str:
+    """One statement-style rendering of a merchant name."""
+    r = rnd.random()
+    text = name.upper() if r < 0.45 else name.lower() if r < 0.6 else name
+    r = rnd.random()
+    if r < 0.25:
+        text = f"{text} #{rnd.randrange(10, 9999)}"
+    elif r < 0.35:
+        text = f"{text} No. {rnd.randrange(1, 300)}"
+    elif r < 0.45:
+        text = f"{text} STORE {rnd.randrange(1, 999):04d}"
+    if rnd.random() < 0.3:
+        text = rnd.choice(_PROCESSORS) + text
+    if rnd.random() < 0.2:
+        text = f"{text} {rnd.choice(_CITIES)}"
+    return text
+
+
+def generate(db, years: float = 2, categories: int = 12, merchants: int = 300, expenses_per_day: float = 12,
+             income_streams: int = 2, mappings: float = 0.3, end: date = None, seed: int = 1, chunk: int = 10000) -> dict:
+    """Fill an empty database and return a summary of what was written.
+
+    `mappings` is the share of merchants with a confirmed MerchantMapping. Derived tables (rollups,
+    amount stats, recurring candidates) are rebuilt at the end, as the migrations would.
+    """
+    rnd = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=int(round(365 * years)))
+    days = (end - start).days + 1
+
+    expense_names = (EXPENSE_CATEGORIES * (categories // len(EXPENSE_CATEGORIES) + 1))[:categories]
+    expense_names = [n if i < len(EXPENSE_CATEGORIES) else f"{n} {i}" for i, n in enumerate(expense_names)]
+    income_names = INCOME_CATEGORIES[:max(1, min(income_streams + 1, len(INCOME_CATEGORIES)))]
+    db.execute(insert(models.Category), [{"name": n, "type": "expense"} for n in expense_names] + [{"name": n, "type": "income"} for n in income_names])
+    cat_ids = {c.name: c.id for c in db.query(models.Category)}
+    expense_ids = [cat_ids[n] for n in expense_names]
+
+    # per-merchant profile: category, typical amount and spread, popularity, subscription day
+    profiles = []
+    for i, name in enumerate(merchant_names(merchants, rnd)):
+        subscription = name in _SUBSCRIPTIONS
+        profiles.append({
+            "name": name,
+            "category_id": cat_ids.get("Subscriptions", expense_ids[-1]) if subscription else rnd.choice(expense_ids),
+            "median": round(rnd.choice([4.99, 9.99, 12.99, 15.49]) if subscription else math.exp(rnd.uniform(1.5, 5.5)), 2),
+            "sigma": 0.0 if subscription else rnd.uniform(0.2, 0.8),
+            "weight": 0.0 if subscription else 1.0 / (i + 1) ** 0.8,  # Zipf-like popularity
+            "day": rnd.randrange(1, 29) if subscription else None,
+        })
+    everyday = [p for p in profiles if p["weight"]]
+    weights = [p["weight"] for p in everyday]
+
+    expenses, n_expenses = [], 0
+
+    def flush():
+        nonlocal expenses, n_expenses
+        if expenses:
+            db.execute(insert(models.Expense), expenses)
+            n_expenses += len(expenses)
+            expenses = []
+
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        count = max(0, int(rnd.gauss(expenses_per_day, expenses_per_day ** 0.5)))
+        for p in rnd.choices(everyday, weights=weights, k=count):
+            amount = p["median"] * math.exp(rnd.gauss(0, p["sigma"]))
+            if rnd.random() < 0.002:  # the occasional outlier for the anomaly paths
+                amount *= rnd.uniform(8, 20)
+            expenses.append({"amount": round(amount, 2), "date": day, "category_id": p["category_id"],
+                             "merchant": noisy(p["name"], rnd), "notes": "synthetic" if rnd.random() < 0.1 else None})
+        for p in profiles:
+            if p["day"] == day.day:
+                expenses.append({"amount": p["median"], "date": day, "category_id": p["category_id"], "merchant": noisy(p["name"], rnd), "notes": None})
+        if day.day == 1 and "Rent" in cat_ids:
+            expenses.append({"amount": 1850.0, "date": day, "category_id": cat_ids["Rent"], "merchant": "Oak Lane Properties", "notes": "rent"})
+        if len(expenses) >= chunk:
+            flush()
+    flush()
+
+    income = []
+    salary = round(rnd.uniform(3500, 9000), 2)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.day in (1, 15):
+            income.append({"amount": salary, "date": day, "category_id": cat_ids["Salary"], "source": "ACME Corp Payroll", "notes": None})
+        if "Interest" in cat_ids and day.day == 28:
+            income.append({"amount": round(rnd.uniform(5, 60), 2), "date": day, "category_id": cat_ids["Interest"], "source": "Savings Interest", "notes": None})
+        if "Freelance" in cat_ids and rnd.random() < 0.03:
+            income.append({"amount": round(rnd.uniform(200, 2500), 2), "date": day, "category_id": cat_ids["Freelance"], "source": f"Client {rnd.randrange(1, 20)}", "notes": None})
+    if income:
+        db.execute(insert(models.Income), income)
+
+    mapped = rnd.sample(profiles, int(len(profiles) * mappings))
+    names = {cid: name for name, cid in cat_ids.items()}
+    mapping_rows = {}
+    for p in mapped:
+        key = normalize_merchant(p["name"])
+        mapping_rows[key] = {"merchant": key, "canonical": p["name"], "category": names[p["category_id"]]}
+    if mapping_rows:
+        db.execute(insert(models.MerchantMapping), list(mapping_rows.values()))
+
+    db.execute(insert(models.Budget), [
+        {"category_id": cid, "amount": round(rnd.uniform(100, 1500), -1), "period_type": rnd.choice(["monthly", "monthly", "weekly"]), "start_date": start}
+        for cid in expense_ids[: max(1, len(expense_ids) // 2)]
+    ] + [{"category_id": None, "amount": 6000.0, "period_type": "monthly", "start_date": start}])
+    goals = [{"name": n, "target_amount": t, "current_amount": 0.0, "deadline": end + timedelta(days=d)}
+             for n, t, d in [("Emergency fund", 15000.0, 365), ("Vacation", 4000.0, 180), ("New laptop", 2200.0, 90)]]
+    db.execute(insert(models.Goal), goals)
+    goal_ids = [g.id for g in db.query(models.Goal)]
+    contributions = [{"goal_id": rnd.choice(goal_ids), "amount": round(rnd.uniform(50, 400), 2),
+                      "date": start + timedelta(days=rnd.randrange(days))} for _ in range(int(24 * years))]
+    db.execute(insert(models.GoalContribution), contributions)
+    for gid in goal_ids:
+        total = sum(c["amount"] for c in contributions if c["goal_id"] == gid)
+        db.query(models.Goal).filter(models.Goal.id == gid).update({"current_amount": round(total, 2)})
+    db.execute(insert(models.Reminder), [{"title": f"Pay bill {i}", "due_date": end + timedelta(days=i - 3)} for i in range(10)])
+
+    rollups.rebuild(db)
+    online_stats.rebuild(db)
+    recurring_detection.detect(db, today=end)
+    db.commit()
+    return {"seed": seed, "start": start.isoformat(), "end": end.isoformat(), "categories": len(cat_ids),
+            "merchants": len(profiles), "expenses": n_expenses, "income": len(income), "mappings": len(mapping_rows)}
+
+
+def main():
+    from benchmarks.common import temp_session, cleanup
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--years", type=float, default=2)
+    ap.add_argument("--categories", type=int, default=12)
+    ap.add_argument("--merchants", type=int, default=300)
+    ap.add_argument("--per-day", type=float, default=12)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    db, engine, path = temp_session()
+    try:
+        print(json.dumps(generate(db, args.years, args.categories, args.merchants, args.per_day, seed=args.seed), indent=2))
+    finally:
+        cleanup(db, engine, path)
+
+
+if __name__ == "__main__":
+    main()
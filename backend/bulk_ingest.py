@@ -0,0 +1,121 @@
+"""Bulk expense/income ingestion shared by /expenses/bulk and /income/bulk.
+
+Rows are validated one by one (schema + category id against a preloaded set), good rows are
+inserted with executemany in chunks, and everything is committed in a single transaction.
+Bad rows are skipped and reported by their position in the payload.
+"""
+import json
+from typing import Iterable, List
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+import models, schemas
+import rollups
+import online_stats
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 50000
+
+
+class BulkWriter:
+    def __init__(self, db, model, create_schema, chunk_size: int = DEFAULT_CHUNK_SIZE, all_or_nothing: bool = False):
+        self.db = db
+        self.model = model
+        self.create_schema = create_schema
+        self.chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+        self.all_or_nothing = all_or_nothing
+        self.valid_category_ids = {cid for (cid,) in db.query(models.Category.id)}
+        self.pending = []
+        self.inserted = 0
+        self.errors: List[schemas.BulkRowError] = []
+
+    def add(self, index: int, item) -> bool:
+        """Validate one raw item (dict or ndjson line). Returns True when a chunk is ready to flush."""
+        try:
+            if isinstance(item, (bytes, str)):
+                item = json.loads(item)
+            row = self.create_schema.model_validate(item)
+        except ValidationError as e:
+            return self._reject(index, _first_error(e))
+        except ValueError as e:
+            return self._reject(index, f"invalid JSON: {e}")
+        if row.category_id not in self.valid_category_ids:
+            return self._reject(index, f"unknown category_id {row.category_id}")
+        self.pending.append(row.model_dump())
+        return len(self.pending) >= self.chunk_size
+
+    def _reject(self, index: int, error: str) -> bool:
+        self.errors.append(schemas.BulkRowError(index=index, error=error))
+        return False
+
+    def flush(self):
+        if not self.pending:
+            return
+        try:
+            self.db.execute(insert(self.model), self.pending)
+            rollups.record_many(self.db, self.model, self.pending)
+            if self.model is models.Expense:
+                online_stats.observe_many(self.db, self.pending)
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            raise HTTPException(status_code=400, detail=f"bulk insert failed: {e.__class__.__name__}")
+        self.inserted += len(self.pending)
+        self.pending = []
+
+    def finish(self) -> schemas.BulkResult:
+        if self.all_or_nothing and self.errors:
+            self.db.rollback()
+            return schemas.BulkResult(inserted=0, rejected=len(self.errors), errors=self.errors)
+        self.flush()
+        self.db.commit()
+        return schemas.BulkResult(inserted=self.inserted, rejected=len(self.errors), errors=self.errors)
+
+    def ingest(self, items: Iterable) -> schemas.BulkResult:
+        """Synchronous driver for scripts and benchmarks."""
+        for i, item in enumerate(items):
+            if self.add(i, item):
+                self.flush()
+        return self.finish()
+
+
+def _first_error(e: ValidationError) -> str:
+    err = e.errors()[0]
+    loc = ".".join(str(x) for x in err.get("loc", ()))
+    return f"{loc}: {err.get('msg')}" if loc else err.get("msg", str(e))
+
+
+async def _request_items(request: Request):
+    """Yield raw items from a JSON array body or, for application/x-ndjson, one line at a time as it streams in."""
+    if "ndjson" in request.headers.get("content-type", ""):
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if pending.strip():
+            yield pending
+        return
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="body must be a JSON array or application/x-ndjson")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="body must be a JSON array or application/x-ndjson")
+    for item in items:
+        yield item
+
+
+async def ingest_request(request: Request, db, model, create_schema, chunk_size: int, all_or_nothing: bool) -> schemas.BulkResult:
+    writer = await run_in_threadpool(BulkWriter, db, model, create_schema, chunk_size, all_or_nothing)
+    i = 0
+    async for item in _request_items(request):
+        if writer.add(i, item):
+            await run_in_threadpool(writer.flush)
+        i += 1
+    return await run_in_threadpool(writer.finish)
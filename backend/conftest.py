@@ -0,0 +1,3 @@
+# test_merge.py and test_budgets_manual.py are manual scripts, not tests: they run at import against
+# ./finance.db or a live server on :8000. Run them with `python test_merge.py` etc.
+collect_ignore = ["test_merge.py", "test_budgets_manual.py"]
@@ -1,13 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-import models
-from routes import expenses, income, categories, reports, ai, budgets, goals, anomalies, reminders
+import database
+from database import engine
+import migrations
+import query_stats
+import recurring_detection
+import metrics
+from routes import expenses, income, categories, reports, ai, budgets, goals, anomalies, reminders, admin
+
+
+# Schema creation, seeding and backfills live in `python -m migrations` (run once per deploy);
+# a worker only checks that it ran for this build.
+@asynccontextmanager
+async def lifespan(app):
+    migrations.require_current(engine)
+    if database.DB_MODE == "async":
+        # the aiosqlite engine is built here rather than at import, which keeps it off the import-time budget
+        query_stats.install(database.get_async_engine().sync_engine)
+    # keeps the recurring_tags behind /ai/recurring_check current
+    detection = None
+    if recurring_detection.DETECT_INTERVAL_SECONDS > 0:
+        detection = asyncio.create_task(recurring_detection.detect_periodically(engine))
+    yield
+    if detection is not None:
+        detection.cancel()
+        with suppress(asyncio.CancelledError):
+            await detection
+
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+app = FastAPI(title="Personal Finance API", lifespan=lifespan)
 
-app = FastAPI(title="Personal Finance API")
+# Per-request SQL counts/timings (Server-Timing header) and the slow-query log at /admin/slow_queries
+query_stats.install(engine)
+app.add_middleware(query_stats.QueryStatsMiddleware)
+# Per-router latency histograms, request/error counts and AI outcome counters at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
 
 # CORS
 app.add_middleware(
@@ -16,6 +47,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(expenses.router)
@@ -27,64 +59,18 @@ app.include_router(budgets.router)
 app.include_router(goals.router)
 app.include_router(anomalies.router)
 app.include_router(reminders.router)
+app.include_router(admin.router)
 
 
-# Seed default categories if none exist (simple, idempotent)
-def seed_default_categories():
-    from sqlalchemy.orm import Session
-    db = None
-    try:
-        db = Session(bind=engine)
-        count = db.query(models.Category).count()
-        if count == 0:
-            defaults = [
-                ("Groceries", "expense"),
-                ("Rent", "expense"),
-                ("Utilities", "expense"),
-                ("Transport", "expense"),
-                ("Food & Drink", "expense"),
-                ("Shopping", "expense"),
-                ("Salary", "income"),
-                ("Interest", "income"),
-            ]
-            for name, typ in defaults:
-                db.add(models.Category(name=name, type=typ))
-            db.commit()
-    except Exception:
-        pass
-    finally:
-        if db:
-            db.close()
-
-
-seed_default_categories()
-
-
-# Backfill existing goals created_at: set to earliest contribution date if present, otherwise today
-def backfill_goals_created_at():
-    from sqlalchemy.orm import Session
-    db = None
-    try:
-        db = Session(bind=engine)
-        goals = db.query(models.Goal).all()
-        for g in goals:
-            if g.created_at is None:
-                # find earliest contribution
-                contrib = db.query(models.GoalContribution).filter(models.GoalContribution.goal_id == g.id).order_by(models.GoalContribution.date).first()
-                if contrib and contrib.date:
-                    g.created_at = contrib.date
-                else:
-                    g.created_at = datetime.utcnow()
-        db.commit()
-    except Exception:
-        pass
-    finally:
-        if db:
-            db.close()
-
-
-backfill_goals_created_at()
-
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Personal Finance API"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    engines = {"sync": engine}
+    if database.DB_MODE == "async":
+        # the hot read endpoints use this pool in async mode
+        engines["async"] = database.get_async_engine().sync_engine
+    return PlainTextResponse(metrics.render(engines), media_type="text/plain; version=0.0.4")
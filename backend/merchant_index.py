@@ -0,0 +1,147 @@
+"""In-process index over MerchantMapping rows for fuzzy merchant lookups.
+
+The routes used to score every saved mapping with ``difflib.SequenceMatcher``. The index
+keeps character bigram posting lists and length buckets of the normalized merchant/canonical
+strings, so only mappings that *can* reach the similarity threshold are scored exactly.
+
+Candidate filtering is lossless for ``ratio() >= threshold``: with M matched characters and
+T = len(a) + len(b), ratio = 2M/T, the matched blocks are separated by at most T - 2M gaps,
+so the strings share at least 3M - T - 1 bigrams (multiset), i.e. at least
+(1.5 * threshold - 1) * T - 1. Lengths are bounded by ratio <= 2 * min(len) / T as well.
+The best match (highest score, lowest id on ties) is therefore identical to the full scan.
+"""
+import difflib
+import math
+import threading
+from collections import Counter, defaultdict
+
+from sqlalchemy import func
+
+import models
+from normalizer import normalize_merchant
+
+FUZZY_THRESHOLD = 0.8
+
+
+def _bigrams(s: str) -> Counter:
+    return Counter(s[i:i + 2] for i in range(len(s) - 1))
+
+
+def similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+class MerchantIndex:
+    def __init__(self, threshold: float = FUZZY_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._keys = {}  # mapping id -> tuple of distinct normalized keys
+        self._postings = defaultdict(dict)  # bigram -> {(mapping id, key): count}
+        self._by_length = defaultdict(set)  # key length -> {(mapping id, key)}
+        self._max_id = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    # maintenance
+
+    def rebuild(self, db):
+        with self._lock:
+            self._clear()
+            for mid, merchant, canonical in db.query(models.MerchantMapping.id, models.MerchantMapping.merchant, models.MerchantMapping.canonical):
+                self._add(mid, merchant, canonical)
+
+    def sync(self, db):
+        """Rebuild if the table changed behind our back (another worker, a script)."""
+        count, max_id = db.query(func.count(models.MerchantMapping.id), func.max(models.MerchantMapping.id)).one()
+        with self._lock:
+            if count != len(self._keys) or (max_id or 0) != self._max_id:
+                self.rebuild(db)
+
+    def upsert(self, mapping):
+        """Add or refresh one mapping after it was written (call after commit so `id` is set)."""
+        with self._lock:
+            self._remove(mapping.id)
+            self._add(mapping.id, mapping.merchant, mapping.canonical)
+
+    def _add(self, mid, merchant, canonical):
+        keys = []
+        for raw in (merchant, canonical):
+            k = normalize_merchant(raw or "")
+            if k and k not in keys:
+                keys.append(k)
+        self._keys[mid] = tuple(keys)
+        self._max_id = max(self._max_id, mid)
+        for k in keys:
+            ref = (mid, k)
+            self._by_length[len(k)].add(ref)
+            for g, c in _bigrams(k).items():
+                self._postings[g][ref] = c
+
+    def _remove(self, mid):
+        for k in self._keys.pop(mid, ()):
+            ref = (mid, k)
+            self._by_length[len(k)].discard(ref)
+            for g in _bigrams(k):
+                self._postings[g].pop(ref, None)
+
+    # lookup
+
+    def _candidates(self, q: str):
+        r = self.threshold
+        la = len(q)
+        lo = math.ceil(la * r / (2 - r) - 1e-9)
+        hi = math.floor(la * (2 - r) / r + 1e-9)
+        slope = 1.5 * r - 1
+        refs = set()
+        if slope <= 0:
+            # no bigram guarantee at low thresholds: length filter only
+            for lb in range(lo, hi + 1):
+                refs |= self._by_length.get(lb, set())
+            return refs
+        # keys short enough that they may share no bigram at all
+        for lb in range(lo, min(hi, math.floor((1 + 1e-9) / slope) - la) + 1):
+            refs |= self._by_length.get(lb, set())
+        common = defaultdict(int)
+        for g, c in _bigrams(q).items():
+            for ref, kc in self._postings.get(g, {}).items():
+                common[ref] += min(c, kc)
+        for ref, n in common.items():
+            lb = len(ref[1])
+            if lo <= lb <= hi and n >= slope * (la + lb) - 1 - 1e-9:
+                refs.add(ref)
+        return refs
+
+    def best_match(self, normalized: str):
+        """Return (mapping id, score) of the best mapping scoring >= threshold, else (None, 0.0)."""
+        if not normalized:
+            return None, 0.0
+        with self._lock:
+            refs = self._candidates(normalized)
+        best_id, best_score = None, 0.0
+        for mid, key in refs:
+            sm = difflib.SequenceMatcher(None, normalized, key)
+            if sm.quick_ratio() < self.threshold:
+                continue
+            score = sm.ratio()
+            if score < self.threshold:
+                continue
+            if score > best_score or (score == best_score and mid < best_id):
+                best_id, best_score = mid, score
+        return best_id, best_score
+
+    def lookup(self, db, normalized: str):
+        """Sync with the table and return (MerchantMapping, score) for the best fuzzy match, else (None, 0.0)."""
+        self.sync(db)
+        mid, score = self.best_match(normalized)
+        if mid is None:
+            return None, 0.0
+        return db.get(models.MerchantMapping, mid), score
+
+
+merchant_index = MerchantIndex()
@@ -0,0 +1,149 @@
+"""In-process metrics in the Prometheus text exposition format, served at GET /metrics.
+
+Kept dependency free and cheap: a request costs one dict lookup and a few integer increments under
+a lock, and the histograms have fixed buckets. Values are per process; with several uvicorn workers
+each scrape sees one of them, so label them by instance in the scraper (or run one worker per port).
+"""
+import bisect
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SCORE_BUCKETS = (0.8, 0.825, 0.85, 0.875, 0.9, 0.925, 0.95, 0.975, 0.99, 1.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        names = self.label_names + ("le",)
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+request_latency = Histogram("finance_http_request_duration_seconds", "Request latency by router.", LATENCY_BUCKETS, ("router", "method"))
+requests_total = Counter("finance_http_requests_total", "Requests by router, method and status code.", ("router", "method", "status"))
+errors_total = Counter("finance_http_errors_total", "Responses with status >= 500 or unhandled exceptions, by router.", ("router",))
+ai_predictions = Counter("finance_ai_predictions_total", "Category predictions by outcome: exact, fuzzy or heuristic.", ("outcome",))
+ai_fuzzy_score = Histogram("finance_ai_fuzzy_match_score", "Similarity of fuzzy merchant mapping hits.", SCORE_BUCKETS)
+
+_collectors = [request_latency, requests_total, errors_total, ai_predictions, ai_fuzzy_score]
+
+
+def record_prediction(outcome: str, score: float = None):
+    ai_predictions.inc(outcome)
+    if score is not None:
+        ai_fuzzy_score.observe(score)
+
+
+def _pool_lines(engines: dict):
+    """Pool gauges for each {label: engine}, one series per engine."""
+    gauges = [
+        ("finance_db_pool_size", "Configured pool size.", "size"),
+        ("finance_db_pool_checked_out", "Connections currently in use.", "checkedout"),
+        ("finance_db_pool_checked_in", "Idle connections in the pool.", "checkedin"),
+        ("finance_db_pool_overflow", "Connections open beyond pool_size (negative while below it).", "overflow"),
+    ]
+    for name, help, attr in gauges:
+        yield f"# HELP {name} {help}"
+        yield f"# TYPE {name} gauge"
+        for label, engine in engines.items():
+            yield f"{name}{_labels(('engine',), (label,))} {getattr(engine.pool, attr, lambda: 0)()}"
+
+
+def render(engines: dict = None) -> str:
+    """All collectors, plus pool gauges for `engines` ({label: engine})."""
+    lines = []
+    for collector in _collectors:
+        lines.extend(collector.render())
+    if engines:
+        lines.extend(_pool_lines(engines))
+    return "\n".join(lines) + "\n"
+
+
+def router_label(scope) -> str:
+    """First segment of the matched route template ("/expenses/{id}" -> "expenses"), so labels stay bounded."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    return path.strip("/").split("/", 1)[0] or "root"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and errors per router."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            router = router_label(scope)
+            method = scope.get("method", "")
+            request_latency.observe(time.perf_counter() - started, router, method)
+            requests_total.inc(router, method, str(status[0]))
+            if status[0] >= 500:
+                errors_total.inc(router)
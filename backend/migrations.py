@@ -0,0 +1,192 @@
+"""Database bootstrap and versioned schema changes.
+
+Run ``python -m migrations`` once per deploy, before starting the API workers: `bootstrap` creates
+missing tables (``Base.metadata.create_all``), then applies pending migrations, including seeding
+and data backfills. The workers themselves only open the engine and refuse to start if the database
+is behind (see `require_current`). When nothing is pending, bootstrap is a single version lookup.
+
+``create_all`` only creates missing tables, it never adds columns or indexes to tables that already
+exist, and it only runs when some migration is pending, so a new model needs a migration entry
+(possibly one whose steps are just a backfill, or none). Each migration runs once, in order, inside
+its own transaction, and is recorded in ``schema_version``. Steps are SQL strings or callables taking
+the connection; they must be safe on a fresh database where create_all already built the current models.
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import Base
+from normalizer import normalize_merchant
+import rollups
+import online_stats
+import recurring_detection
+
+def _add_column(table: str, column: str, ddl_type: str):
+    def step(conn):
+        cols = [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+        if column not in cols:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+    return step
+
+
+def backfill_merchant_normalized(conn, batch_size: int = 5000) -> int:
+    """Fill expenses.merchant_normalized where it is missing. Idempotent; safe to rerun as a repair job."""
+    total = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(text("SELECT id, merchant FROM expenses WHERE id > :last AND merchant IS NOT NULL AND merchant_normalized IS NULL ORDER BY id LIMIT :n"),
+                            {"last": last_id, "n": batch_size}).fetchall()
+        if not rows:
+            return total
+        conn.execute(text("UPDATE expenses SET merchant_normalized = :nm WHERE id = :id"),
+                     [{"id": rid, "nm": normalize_merchant(m) or None} for rid, m in rows])
+        total += len(rows)
+        last_id = rows[-1][0]
+
+
+DEFAULT_CATEGORIES = [
+    ("Groceries", "expense"),
+    ("Rent", "expense"),
+    ("Utilities", "expense"),
+    ("Transport", "expense"),
+    ("Food & Drink", "expense"),
+    ("Shopping", "expense"),
+    ("Salary", "income"),
+    ("Interest", "income"),
+]
+
+
+def seed_default_categories(conn):
+    """Give a database without any categories the defaults."""
+    if conn.execute(text("SELECT COUNT(*) FROM categories")).scalar() == 0:
+        conn.execute(text("INSERT INTO categories (name, type) VALUES (:name, :type)"),
+                     [{"name": name, "type": typ} for name, typ in DEFAULT_CATEGORIES])
+
+
+def backfill_goals_created_at(conn):
+    """Set missing goals.created_at to the goal's earliest contribution, else now; one UPDATE for all goals."""
+    conn.execute(text(
+        "UPDATE goals SET created_at = COALESCE("
+        "(SELECT MIN(c.date) FROM goal_contributions c WHERE c.goal_id = goals.id), :now) "
+        "WHERE created_at IS NULL"
+    ), {"now": datetime.utcnow()})
+
+
+def unique_recurring_merchants(conn):
+    """Keep one recurring tag per merchant (confirmed first, then the oldest) and make merchant unique."""
+    conn.execute(text(
+        "DELETE FROM recurring_tags WHERE merchant IS NOT NULL AND id != ("
+        "SELECT t.id FROM recurring_tags t WHERE t.merchant = recurring_tags.merchant "
+        "ORDER BY COALESCE(t.confirmed, 0) DESC, t.id LIMIT 1)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_recurring_tags_merchant"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_recurring_tags_merchant ON recurring_tags (merchant)"))
+
+
+MIGRATIONS = [
+    (1, "date and category/date indexes for report and budget queries", [
+        "CREATE INDEX IF NOT EXISTS ix_expenses_date ON expenses (date)",
+        "CREATE INDEX IF NOT EXISTS ix_expenses_category_date ON expenses (category_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_income_date ON income (date)",
+        "CREATE INDEX IF NOT EXISTS ix_income_category_date ON income (category_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_anomaly_logs_expense_id ON anomaly_logs (expense_id)",
+    ]),
+    (2, "persisted normalized merchant on expenses", [
+        _add_column("expenses", "merchant_normalized", "VARCHAR"),
+        "CREATE INDEX IF NOT EXISTS ix_expenses_merchant_normalized_date ON expenses (merchant_normalized, date)",
+        backfill_merchant_normalized,
+    ]),
+    (3, "daily expense/income rollups", [
+        # tables come from create_all; populate them from existing rows
+        rollups.rebuild,
+    ]),
+    (4, "running amount statistics for anomaly scoring", [
+        online_stats.rebuild,
+    ]),
+    (5, "recurring candidates looked up by merchant", [
+        _add_column("recurring_tags", "confidence", "FLOAT"),
+        # detect() upserts on merchant, which needs the unique index (migration 8 adds it for databases past 5)
+        unique_recurring_merchants,
+        recurring_detection.detect,
+    ]),
+    (6, "default categories for a new database", [
+        seed_default_categories,
+    ]),
+    (7, "goals.created_at for goals created before it existed", [
+        _add_column("goals", "created_at", "DATETIME"),
+        backfill_goals_created_at,
+    ]),
+    (8, "one recurring tag per merchant", [
+        unique_recurring_merchants,
+    ]),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, description VARCHAR, applied_at DATETIME)"))
+
+
+def current_version(conn) -> int:
+    _ensure_version_table(conn)
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def require_current(engine):
+    """Raise if the database is not at LATEST_VERSION (i.e. `bootstrap` hasn't run for this build)."""
+    with engine.connect() as conn:
+        version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() if _has_version_table(conn) else 0
+    if (version or 0) < LATEST_VERSION:
+        raise RuntimeError(f"database schema is at version {version or 0}, this build needs {LATEST_VERSION}: run `python -m migrations` first")
+
+
+def _has_version_table(conn) -> bool:
+    return conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")).first() is not None
+
+
+def bootstrap(engine):
+    """Create missing tables and apply pending migrations. Returns the versions applied (empty when current)."""
+    with engine.begin() as conn:
+        if current_version(conn) >= LATEST_VERSION:
+            return []
+    Base.metadata.create_all(bind=engine)
+    return apply_migrations(engine)
+
+
+def apply_migrations(engine, target: int = None):
+    """Apply pending migrations up to `target` (default: latest). Returns the versions applied."""
+    applied = []
+    with engine.begin() as conn:
+        version = current_version(conn)
+    for number, description, steps in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        with engine.begin() as conn:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(text(step))
+            conn.execute(text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                         {"v": number, "d": description, "t": datetime.utcnow()})
+        applied.append(number)
+    return applied
+
+
+if __name__ == "__main__":
+    import sys
+    from database import engine
+
+    if sys.argv[1:] == ["backfill-merchants"]:
+        with engine.begin() as conn:
+            print(f"backfilled {backfill_merchant_normalized(conn)} expenses")
+    elif sys.argv[1:] == ["rebuild-rollups"]:
+        with engine.begin() as conn:
+            rollups.rebuild(conn)
+        print("rollups rebuilt")
+    elif sys.argv[1:] == ["rebuild-stats"]:
+        with engine.begin() as conn:
+            online_stats.rebuild(conn)
+        print("amount statistics rebuilt")
+    else:
+        print(f"applied migrations: {bootstrap(engine) or 'none pending'}")
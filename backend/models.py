@@ -1,7 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Index
+from sqlalchemy.orm import relationship, validates
 from database import Base
 from datetime import datetime
+from normalizer import normalize_merchant
+
+
+def _merchant_normalized_default(context):
+    # core/bulk inserts that only pass `merchant`
+    return normalize_merchant(context.get_current_parameters().get("merchant")) or None
 
 class Category(Base):
     __tablename__ = "categories"
@@ -11,26 +17,77 @@ class Category(Base):
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        Index("ix_expenses_category_date", "category_id", "date"),
+        Index("ix_expenses_merchant_normalized_date", "merchant_normalized", "date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     amount = Column(Float, nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, index=True)
     category_id = Column(Integer, ForeignKey("categories.id"))
     category = relationship("Category")
     merchant = Column(String)
+    merchant_normalized = Column(String, default=_merchant_normalized_default)  # normalizer.normalize_merchant(merchant)
     notes = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    @validates("merchant")
+    def _sync_merchant_normalized(self, key, value):
+        self.merchant_normalized = normalize_merchant(value) or None
+        return value
+
 class Income(Base):
     __tablename__ = "income"
+    __table_args__ = (
+        Index("ix_income_category_date", "category_id", "date"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     amount = Column(Float, nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, index=True)
     category_id = Column(Integer, ForeignKey("categories.id"))
     category = relationship("Category")
     source = Column(String)
     notes = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class ExpenseDailyRollup(Base):
+    """Per (date, category) expense totals, kept in step with `expenses` by rollups.py."""
+    __tablename__ = "expense_daily_rollups"
+    __table_args__ = (
+        Index("ix_expense_daily_rollups_category_date", "category_id", "date"),
+    )
+    date = Column(Date, primary_key=True)
+    category_id = Column(Integer, primary_key=True)  # 0 = no category
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+class IncomeDailyRollup(Base):
+    __tablename__ = "income_daily_rollups"
+    __table_args__ = (
+        Index("ix_income_daily_rollups_category_date", "category_id", "date"),
+    )
+    date = Column(Date, primary_key=True)
+    category_id = Column(Integer, primary_key=True)  # 0 = no category
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
+class AmountStats(Base):
+    """Running count/mean/M2 (Welford) of expense amounts per category or normalized merchant."""
+    __tablename__ = "amount_stats"
+    scope = Column(String, primary_key=True)  # "category" or "merchant"
+    key = Column(String, primary_key=True)  # category id (0 = none) or merchant_normalized
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+
+class AmountSketchBin(Base):
+    """Log-scale histogram bins (DDSketch-style) backing approximate quantiles for AmountStats."""
+    __tablename__ = "amount_sketch_bins"
+    scope = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    bin = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
 class Budget(Base):
     __tablename__ = "budgets"
     id = Column(Integer, primary_key=True, index=True)
@@ -73,12 +130,13 @@ class GoalContribution(Base):
 class RecurringTag(Base):
     __tablename__ = "recurring_tags"
     id = Column(Integer, primary_key=True, index=True)
-    merchant = Column(String, nullable=True)
+    merchant = Column(String, nullable=True, index=True, unique=True)  # one tag per merchant; detection upserts on it
     category = Column(String, nullable=True)
     average_amount = Column(Float, nullable=True)
     interval_days = Column(Integer, nullable=True)
     next_expected = Column(Date, nullable=True)
     confirmed = Column(Integer, default=0)  # 0 not confirmed, 1 confirmed
+    confidence = Column(Float, nullable=True)  # set by recurring_detection
     notes = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -86,7 +144,7 @@ class RecurringTag(Base):
 class AnomalyLog(Base):
     __tablename__ = "anomaly_logs"
     id = Column(Integer, primary_key=True, index=True)
-    expense_id = Column(Integer, nullable=True)
+    expense_id = Column(Integer, nullable=True, index=True)
     amount = Column(Float, nullable=True)
     category = Column(String, nullable=True)
     score = Column(Float, nullable=True)
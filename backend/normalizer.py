@@ -0,0 +1,18 @@
+import re
+
+_STORE_NUMBER = re.compile(r"#\d+")
+_NO_NUMBER = re.compile(r"\bno\.?\s*\d+\b")
+_NON_ALNUM = re.compile(r"[^a-z0-9\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_merchant(s: str) -> str:
+    """Lowercase, drop store numbers (`#123`, `No. 44`) and punctuation, collapse whitespace."""
+    if not s:
+        return ""
+    s = s.lower().strip()
+    s = _STORE_NUMBER.sub("", s)
+    s = _NO_NUMBER.sub("", s)
+    s = _NON_ALNUM.sub("", s)
+    s = _SPACES.sub(" ", s).strip()
+    return s
@@ -0,0 +1,243 @@
+"""Streaming amount statistics per category and per normalized merchant.
+
+Every expense write folds its amount into `amount_stats` (count, mean, M2 via Welford/Chan, updated
+with a single atomic upsert) and into `amount_sketch_bins`, a DDSketch-style log histogram that gives
+quantiles within SKETCH_ALPHA relative error and, unlike most sketches, supports deletions. Scoring a
+new amount then needs two indexed lookups per key instead of a scan over past expenses.
+
+Scoring uses anomaly_scoring's definition (modified z on median/MAD, same cutoff, history minimum and
+fallback); the median and MAD come from the sketch bins here.
+
+`rebuild` recomputes everything from the raw table: ``python migrations.py rebuild-stats``.
+"""
+import math
+from collections import defaultdict
+
+from sqlalchemy import select, delete, bindparam, case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import models
+from normalizer import normalize_merchant
+from anomaly_scoring import FALLBACK_THRESHOLD, MIN_HISTORY, Z_THRESHOLD, fallback_score, modified_z
+
+CATEGORY = "category"
+MERCHANT = "merchant"
+
+SKETCH_ALPHA = 0.02
+_GAMMA = (1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA)
+_LOG_GAMMA = math.log(_GAMMA)
+_MIN_VALUE = 0.01
+_ZERO_BIN = math.ceil(math.log(_MIN_VALUE) / _LOG_GAMMA) - 1  # amounts <= 0.01 (incl. refunds)
+
+
+def sketch_bin(x: float) -> int:
+    if x is None or x <= _MIN_VALUE:
+        return _ZERO_BIN
+    return math.ceil(math.log(x) / _LOG_GAMMA)
+
+
+def bin_value(i: int) -> float:
+    if i == _ZERO_BIN:
+        return 0.0
+    return 2 * _GAMMA ** i / (_GAMMA + 1)
+
+
+def keys_for(category_id, merchant_normalized):
+    keys = [(CATEGORY, str(category_id or 0))]
+    if merchant_normalized:
+        keys.append((MERCHANT, merchant_normalized))
+    return keys
+
+
+class Snapshot:
+    """Read-only view of one key's statistics."""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, bins=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.bins = bins or {}
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 and self.m2 > 0 else 0.0
+
+    def quantile(self, q: float) -> float:
+        total = sum(self.bins.values())
+        if not total:
+            return 0.0
+        rank = q * (total - 1)
+        seen = 0
+        for i in sorted(self.bins):
+            seen += self.bins[i]
+            if seen > rank:
+                return bin_value(i)
+        return bin_value(max(self.bins))
+
+    def median_mad(self):
+        """(median, median absolute deviation) from the bins, within the sketch's relative error."""
+        median = self.quantile(0.5)
+        deviations = sorted((abs(bin_value(i) - median), n) for i, n in self.bins.items())
+        rank = 0.5 * (sum(self.bins.values()) - 1)
+        seen = 0
+        for deviation, n in deviations:
+            seen += n
+            if seen > rank:
+                return median, deviation
+        return median, 0.0
+
+
+def _by_scope(keys):
+    """Group (scope, key) pairs per scope: `scope = ? AND key IN (...)` uses the primary key,
+    a row-value IN list does not."""
+    grouped = defaultdict(list)
+    for scope, key in keys:
+        grouped[scope].append(key)
+    for scope, names in grouped.items():
+        for i in range(0, len(names), 500):
+            yield scope, names[i:i + 500]
+
+
+def load(db, keys) -> dict:
+    """Snapshots for the given (scope, key) pairs, two queries per scope regardless of how many."""
+    keys = set(keys)
+    out = {k: Snapshot() for k in keys}
+    S, B = models.AmountStats, models.AmountSketchBin
+    for scope, names in _by_scope(keys):
+        for key, count, mean, m2 in db.execute(select(S.key, S.count, S.mean, S.m2).where(S.scope == scope, S.key.in_(names))):
+            snap = out[(scope, key)]
+            snap.count, snap.mean, snap.m2 = count, mean, m2
+        for key, b, count in db.execute(select(B.key, B.bin, B.count).where(B.scope == scope, B.key.in_(names))):
+            out[(scope, key)].bins[b] = count
+    return out
+
+
+def assess(snapshots: dict, amount, category_id=None, merchant_normalized=None):
+    """Return (is_anomaly, score, scope, typical) for `amount` against the most specific usable history.
+
+    The merchant's own history wins when it has MIN_HISTORY samples and MAD > 0, then the category's;
+    otherwise the old fixed threshold applies (scope None). `typical` is the median.
+    """
+    if amount is None:
+        return False, None, None, None
+    for scope, key in reversed(keys_for(category_id, merchant_normalized)):
+        snap = snapshots.get((scope, key))
+        if snap and snap.count >= MIN_HISTORY:
+            median, mad = snap.median_mad()
+            if mad > 0:
+                z = modified_z(amount, median, mad)
+                return z > Z_THRESHOLD, round(z, 3), scope, round(median, 2)
+    return amount > FALLBACK_THRESHOLD, round(fallback_score(amount), 3), None, None
+
+
+def score(db, amount, category_id=None, merchant_normalized=None):
+    return assess(load(db, keys_for(category_id, merchant_normalized)), amount, category_id, merchant_normalized)
+
+
+# writes
+
+def _add_stats(db, params):
+    """Fold per-key batches {scope, key, count, mean, m2} into amount_stats (Chan's parallel combine)."""
+    table = models.AmountStats.__table__
+    stmt = sqlite_insert(table)
+    ex = stmt.excluded
+    n = table.c.count + ex.count
+    delta = ex.mean - table.c.mean
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.scope, table.c.key],
+        set_={
+            "count": n,
+            "mean": table.c.mean + delta * ex.count / n,
+            "m2": table.c.m2 + ex.m2 + delta * delta * table.c.count * ex.count / n,
+        },
+    )
+    db.execute(stmt, params)
+
+
+def _add_bins(db, params):
+    table = models.AmountSketchBin.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.scope, table.c.key, table.c.bin],
+        set_={"count": table.c.count + stmt.excluded.count},
+    )
+    db.execute(stmt, params)
+
+
+def observe(db, category_id, merchant_normalized, amount):
+    """Add one expense amount to its category and merchant statistics."""
+    if amount is None:
+        return
+    keys = keys_for(category_id, merchant_normalized)
+    _add_stats(db, [{"scope": s, "key": k, "count": 1, "mean": amount, "m2": 0.0} for s, k in keys])
+    _add_bins(db, [{"scope": s, "key": k, "bin": sketch_bin(amount), "count": 1} for s, k in keys])
+
+
+def observe_many(db, rows):
+    """Add many new expenses (dicts with category_id, merchant_normalized or merchant, amount)."""
+    acc = defaultdict(lambda: [0, 0.0, 0.0])  # Welford per key within the batch
+    bins = defaultdict(int)
+    for r in rows:
+        x = r.get("amount")
+        if x is None:
+            continue
+        nm = r.get("merchant_normalized")
+        if nm is None and r.get("merchant"):
+            nm = normalize_merchant(r["merchant"])
+        for key in keys_for(r.get("category_id"), nm):
+            st = acc[key]
+            st[0] += 1
+            d = x - st[1]
+            st[1] += d / st[0]
+            st[2] += d * (x - st[1])
+            bins[key + (sketch_bin(x),)] += 1
+    if acc:
+        _add_stats(db, [{"scope": s, "key": k, "count": c, "mean": m, "m2": m2} for (s, k), (c, m, m2) in acc.items()])
+        _add_bins(db, [{"scope": s, "key": k, "bin": b, "count": c} for (s, k, b), c in bins.items()])
+
+
+def forget(db, category_id, merchant_normalized, amount):
+    """Remove one expense amount (delete, or the old side of an update)."""
+    if amount is None:
+        return
+    S = models.AmountStats.__table__
+    B = models.AmountSketchBin.__table__
+    keys = keys_for(category_id, merchant_normalized)
+    x = bindparam("x")
+    new_mean = (S.c.count * S.c.mean - x) / (S.c.count - 1)
+    db.execute(
+        S.update().where(S.c.scope == bindparam("s"), S.c.key == bindparam("k")).values(
+            count=S.c.count - 1,
+            mean=case((S.c.count > 1, new_mean), else_=0.0),
+            m2=case((S.c.count > 1, func.max(0.0, S.c.m2 - (x - new_mean) * (x - S.c.mean))), else_=0.0),
+        ),
+        [{"s": s, "k": k, "x": amount} for s, k in keys],
+    )
+    db.execute(
+        B.update().where(B.c.scope == bindparam("s"), B.c.key == bindparam("k"), B.c.bin == bindparam("b")).values(count=B.c.count - 1),
+        [{"s": s, "k": k, "b": sketch_bin(amount)} for s, k in keys],
+    )
+    for scope, names in _by_scope(keys):
+        db.execute(delete(S).where(S.c.scope == scope, S.c.key.in_(names), S.c.count <= 0))
+        db.execute(delete(B).where(B.c.scope == scope, B.c.key.in_(names), B.c.count <= 0))
+
+
+def merge_category(db, source_id: int, target_id: int):
+    """Fold the source category's statistics into the target (category merge)."""
+    src = load(db, [(CATEGORY, str(source_id))])[(CATEGORY, str(source_id))]
+    S, B = models.AmountStats.__table__, models.AmountSketchBin.__table__
+    db.execute(delete(S).where(S.c.scope == CATEGORY, S.c.key == str(source_id)))
+    db.execute(delete(B).where(B.c.scope == CATEGORY, B.c.key == str(source_id)))
+    if src.count:
+        _add_stats(db, [{"scope": CATEGORY, "key": str(target_id), "count": src.count, "mean": src.mean, "m2": src.m2}])
+        _add_bins(db, [{"scope": CATEGORY, "key": str(target_id), "bin": b, "count": c} for b, c in src.bins.items()])
+
+
+def rebuild(db):
+    """Recompute all statistics from the expenses table. Works on a Session or Connection; caller commits."""
+    db.execute(delete(models.AmountStats.__table__))
+    db.execute(delete(models.AmountSketchBin.__table__))
+    E = models.Expense
+    result = db.execute(select(E.category_id, E.merchant_normalized, E.amount).execution_options(yield_per=10000))
+    for part in result.partitions():
+        observe_many(db, [{"category_id": c, "merchant_normalized": m, "amount": a} for c, m, a in part])
@@ -0,0 +1,75 @@
+"""Keyset pagination and field projection for the expense/income listings.
+
+Pages are ordered by (date DESC, id DESC). The cursor is an opaque token for the last row of the
+previous page, and the next page starts strictly after it. This costs the same at any depth, and rows
+inserted meanwhile don't shift later pages. SQLite keeps the rowid (`id`) as the trailing key of every
+index, so ix_<table>_date and ix_<table>_category_date already serve this order without a sort.
+"""
+import base64
+import json
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import tuple_
+from sqlalchemy.orm import load_only, selectinload
+
+import schemas
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(row) -> str:
+    raw = json.dumps([row.date.isoformat(), row.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        day, row_id = json.loads(raw)
+        return date.fromisoformat(day), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+def ordered(query, model, cursor: Optional[str]):
+    """Apply the listing order and, with a cursor, the keyset predicate."""
+    if cursor:
+        query = query.filter(tuple_(model.date, model.id) < tuple_(*decode_cursor(cursor)))
+    return query.order_by(model.date.desc(), model.id.desc())
+
+
+def parse_fields(fields: Optional[str], schema) -> Optional[list]:
+    """Validate a comma separated `fields` parameter against the response schema."""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in schema.model_fields]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"unknown fields {unknown}, expected some of {sorted(schema.model_fields)}")
+    return names
+
+
+def project(query, model, names: list):
+    """Load only the columns behind `names` (plus what the cursor needs)."""
+    columns = {"id", "date"} | {n for n in names if n != "category"}
+    if "category" in names:
+        columns.add("category_id")
+        query = query.options(selectinload(model.category))
+    return query.options(load_only(*[getattr(model, c) for c in sorted(columns)]))
+
+
+def next_cursor(rows, limit: int) -> Optional[str]:
+    """Cursor for the page after `rows`, or None when this was the last one."""
+    return encode_cursor(rows[-1]) if rows and len(rows) == limit else None
+
+
+def projected_response(rows, names: list, headers: dict) -> JSONResponse:
+    """Only the requested fields per row, bypassing the full response model."""
+    def value(row, name):
+        v = getattr(row, name)
+        return schemas.Category.model_validate(v) if name == "category" and v is not None else v
+    return JSONResponse(jsonable_encoder([{n: value(r, n) for n in names} for r in rows]), headers=headers)
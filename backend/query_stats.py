@@ -0,0 +1,141 @@
+"""Per-request SQL statistics and a slow-query log, built on SQLAlchemy cursor events.
+
+`install(engine)` times every statement. While a request runs under `QueryStatsMiddleware` its
+statements are counted and timed into a RequestStats held in a context variable (AnyIO copies the
+context into the threadpool, so sync handlers report into the same object). The middleware adds a
+``Server-Timing`` header with the totals. Statements slower than SLOW_QUERY_MS also go into a bounded
+ring buffer served by GET /admin/slow_queries and, with FINANCE_EXPLAIN_SLOW_QUERIES=1, have their
+EXPLAIN QUERY PLAN logged.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get("FINANCE_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_BUFFER = int(os.environ.get("FINANCE_SLOW_QUERY_BUFFER", "200"))
+EXPLAIN_SLOW_QUERIES = os.environ.get("FINANCE_EXPLAIN_SLOW_QUERIES", "0") == "1"
+SLOWEST_PER_REQUEST = 3
+MAX_STATEMENT_CHARS = 2000
+
+
+class RequestStats:
+    """Statement count, total DB time and the slowest statements of one request."""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest = []  # (ms, statement), longest first
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, ms: float):
+        with self._lock:
+            self.count += 1
+            self.total_ms += ms
+            if len(self.slowest) < SLOWEST_PER_REQUEST or ms > self.slowest[-1][0]:
+                self.slowest.append((ms, statement))
+                self.slowest.sort(key=lambda s: -s[0])
+                del self.slowest[SLOWEST_PER_REQUEST:]
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("query_stats", default=None)
+slow_queries = deque(maxlen=SLOW_QUERY_BUFFER)
+
+
+def current() -> Optional[RequestStats]:
+    return _current.get()
+
+
+# the start time lives on the per-statement execution context, so a statement that fails (and never
+# reaches after_cursor_execute) leaves nothing behind on the pooled connection
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_start", None)
+    if started is None:  # SQLAlchemy-internal statements without a context aren't timed
+        return
+    ms = (time.perf_counter() - started) * 1000
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, ms)
+    if ms >= SLOW_QUERY_MS:
+        entry = {
+            "at": datetime.utcnow().isoformat(timespec="milliseconds"),
+            "ms": round(ms, 2),
+            "path": stats.path if stats else None,
+            "statement": statement[:MAX_STATEMENT_CHARS],
+            "executemany": executemany,
+        }
+        if EXPLAIN_SLOW_QUERIES and not executemany:
+            entry["plan"] = _explain(conn, statement, parameters)
+            logger.warning("slow query (%.1f ms) %s\n  plan: %s", ms, statement, entry["plan"])
+        slow_queries.append(entry)
+
+
+def _explain(conn, statement, parameters):
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")):
+        return None
+    try:
+        # a fresh DBAPI cursor: the statement's own may still hold rows, and the aiosqlite adapter's
+        # connection has no execute() shortcut (its cursors do, under run_sync)
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:  # never let diagnostics break the request
+        return [f"explain failed: {e}"]
+
+
+def install(engine):
+    """Attach the timing listeners to an engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def server_timing(stats: RequestStats, app_ms: float) -> str:
+    parts = [f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"']
+    if stats.slowest:
+        parts.append(f"db-slowest;dur={stats.slowest[0][0]:.1f}")
+    parts.append(f"app;dur={app_ms:.1f}")
+    return ", ".join(parts)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: scopes a RequestStats to each HTTP request and reports it in Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats(scope.get("path"))
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                value = server_timing(stats, (time.perf_counter() - started) * 1000)
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", value.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,153 @@
+"""Recurring-transaction detection over all merchants at once.
+
+One query reads the history window ordered by (merchant_normalized, date), which the
+ix_expenses_merchant_normalized_date index delivers presorted; intervals between consecutive
+occurrences and their per-merchant mean/stdev are then computed column-wise. Results are upserted
+into `recurring_tags` as unconfirmed candidates, so `/ai/recurring_check` is a lookup by merchant.
+Tags confirmed through `/ai/recurring_confirm` keep the user's amount and interval; detection only
+refreshes their confidence (and fills in next_expected if they have none).
+
+Each worker runs it in the background every FINANCE_RECURRING_DETECT_MINUTES (0 disables it), so new
+expenses show up without a manual run; the first run waits a full interval, so booting a worker never
+pulls in pandas. ``python recurring_detection.py``, ``POST /ai/recurring/detect`` and migration 5 run
+it on demand.
+pandas/numpy are imported inside the functions: the API imports this module, but only detection needs them.
+"""
+import asyncio
+import logging
+import os
+from datetime import date, timedelta
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select, update, delete, bindparam, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from fastapi.concurrency import run_in_threadpool
+
+import models
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DAYS = 365
+DETECT_INTERVAL_SECONDS = float(os.environ.get("FINANCE_RECURRING_DETECT_MINUTES", "60")) * 60
+MIN_CONFIDENCE = 0.3  # weaker candidates are not stored
+RECURRING_CONFIDENCE = 0.7
+FULL_CONFIDENCE_INTERVALS = 12
+
+
+def interval_stats(history: "pd.DataFrame") -> "pd.DataFrame":
+    """Per-merchant interval stats from a frame with merchant, date, amount, category_id sorted by (merchant, date)."""
+    import numpy as np
+    import pandas as pd
+
+    merchants = history["merchant"]
+    dates = pd.to_datetime(history["date"])
+    same = merchants.eq(merchants.shift())
+    gaps = dates.diff().dt.days.where(same)
+    grouped = pd.DataFrame({"merchant": merchants, "gap": gaps, "amount": history["amount"].astype(float), "date": dates}).groupby("merchant", sort=False)
+    stats = pd.DataFrame({
+        "intervals": grouped["gap"].count(),
+        "mean": grouped["gap"].mean(),
+        "stdev": grouped["gap"].std(ddof=0),
+        "last": grouped["date"].max(),
+        "average_amount": grouped["amount"].mean(),
+    })
+    # most frequent category per merchant
+    pairs = pd.DataFrame({"merchant": merchants, "category_id": history["category_id"].fillna(0).astype("int64")})
+    counts = pairs.groupby(["merchant", "category_id"]).size().sort_values(ascending=False, kind="stable").reset_index()
+    stats["category_id"] = counts.drop_duplicates("merchant").set_index("merchant")["category_id"]
+    stats = stats[stats["intervals"] > 0]
+    # same score the per-merchant check used: more samples and lower spread -> higher confidence
+    confidence = (stats["intervals"] / FULL_CONFIDENCE_INTERVALS) * (1.0 - stats["stdev"] / (stats["mean"] + 1))
+    stats["confidence"] = np.clip(confidence.to_numpy(), 0.0, 1.0)
+    return stats
+
+
+def detect(db, today: date = None, history_days: int = HISTORY_DAYS) -> dict:
+    """Recompute recurring candidates from the last `history_days` days. Works on a Session or Connection; caller commits."""
+    import pandas as pd
+
+    today = today or date.today()
+    E = models.Expense
+    rows = db.execute(
+        select(E.merchant_normalized, E.date, E.amount, E.category_id)
+        .where(E.merchant_normalized.is_not(None), E.merchant_normalized != "", E.date >= today - timedelta(days=history_days))
+        .order_by(E.merchant_normalized, E.date)
+    ).all()
+    history = pd.DataFrame(rows, columns=["merchant", "date", "amount", "category_id"])
+    stats = interval_stats(history) if len(history) else pd.DataFrame(columns=["confidence"])
+    stats = stats[stats["confidence"] >= MIN_CONFIDENCE]
+
+    names = dict(db.execute(select(models.Category.id, models.Category.name)).all())
+    T = models.RecurringTag
+    existing = {}
+    for tag_id, merchant, confirmed in db.execute(select(T.id, T.merchant, T.confirmed).order_by(T.id)):
+        existing.setdefault(merchant, (tag_id, confirmed))
+
+    inserts, updates, confirmed_updates = [], [], []
+    for merchant, r in stats.iterrows():
+        values = {
+            "average_amount": round(float(r["average_amount"]), 2),
+            "interval_days": int(round(r["mean"])),
+            "next_expected": (r["last"] + pd.Timedelta(days=round(r["mean"]))).date(),
+            "confidence": round(float(r["confidence"]), 2),
+        }
+        if merchant in existing:
+            tag_id, confirmed = existing[merchant]
+            if confirmed:
+                confirmed_updates.append({"tag_id": tag_id, "detected_confidence": values["confidence"], "detected_next": values["next_expected"]})
+            else:
+                updates.append({"tag_id": tag_id, **values})
+        else:
+            inserts.append({"merchant": merchant, "category": names.get(int(r["category_id"])), "confirmed": 0, **values})
+    if updates:
+        db.execute(update(T.__table__).where(T.__table__.c.id == bindparam("tag_id")), updates)
+    if confirmed_updates:
+        t = T.__table__
+        db.execute(update(t).where(t.c.id == bindparam("tag_id")).values(
+            confidence=bindparam("detected_confidence"),
+            next_expected=func.coalesce(t.c.next_expected, bindparam("detected_next")),
+        ), confirmed_updates)
+    if inserts:
+        # another worker's run may have inserted the same merchant since `existing` was read
+        t = T.__table__
+        stmt = sqlite_insert(t)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[t.c.merchant],
+            set_={c: stmt.excluded[c] for c in ("average_amount", "interval_days", "next_expected", "confidence")},
+            where=func.coalesce(t.c.confirmed, 0) == 0,
+        ), inserts)
+
+    # unconfirmed candidates that no longer qualify are dropped; confirmed tags are the user's
+    stale = [tag_id for merchant, (tag_id, confirmed) in existing.items() if not confirmed and merchant not in stats.index]
+    for i in range(0, len(stale), 500):
+        db.execute(delete(T.__table__).where(T.__table__.c.id.in_(stale[i:i + 500])))
+    return {"merchants": int(history["merchant"].nunique()) if len(history) else 0, "candidates": len(stats),
+            "created": len(inserts), "updated": len(updates) + len(confirmed_updates), "removed": len(stale)}
+
+
+def detect_committed(engine) -> dict:
+    with engine.begin() as conn:
+        return detect(conn)
+
+
+async def detect_periodically(engine, interval: float = DETECT_INTERVAL_SECONDS):
+    """Run `detect` in the threadpool every `interval` seconds, starting one interval from now, until cancelled.
+
+    A run that fails (e.g. another worker's run committed first) is logged and retried next time.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            logger.info("recurring detection: %s", await run_in_threadpool(detect_committed, engine))
+        except Exception:
+            logger.exception("recurring detection failed")
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    print(detect_committed(engine))
@@ -0,0 +1,88 @@
+"""Daily (date, category_id) rollups of expenses and income.
+
+Every write path that changes an expense/income amount, date or category calls into this module
+inside the same session/transaction, so the rollup tables always agree with the raw rows after
+commit. Report endpoints aggregate the rollups instead of raw rows, which makes their cost
+proportional to the number of days x categories rather than the number of transactions.
+
+Writes that bypass these helpers (ad-hoc scripts, manual SQL) cause drift; `rebuild` recomputes
+everything from the raw tables: ``python migrations.py rebuild-rollups``.
+"""
+from collections import defaultdict
+
+from sqlalchemy import func, delete, bindparam, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import models
+from summary_cache import note_delta, note_stale
+
+NO_CATEGORY = 0
+
+ROLLUPS = {
+    models.Expense: models.ExpenseDailyRollup,
+    models.Income: models.IncomeDailyRollup,
+}
+KINDS = {models.Expense: "expense", models.Income: "income"}
+
+
+def _upsert(db, rollup, params):
+    table = rollup.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.date, table.c.category_id],
+        set_={"total": table.c.total + stmt.excluded.total, "count": table.c.count + stmt.excluded.count},
+    )
+    db.execute(stmt, params)
+    emptied = [{"d": p["date"], "c": p["category_id"]} for p in params if p["count"] < 0]
+    if emptied:
+        db.execute(delete(table).where(table.c.date == bindparam("d"), table.c.category_id == bindparam("c"), table.c.count <= 0), emptied)
+
+
+def record(db, model, day, category_id, amount, count: int = 1):
+    """Add (count=1) or remove (count=-1, negative amount) one row's contribution."""
+    _upsert(db, ROLLUPS[model], [{"date": day, "category_id": category_id or NO_CATEGORY, "total": amount or 0.0, "count": count}])
+    note_delta(db, KINDS[model], amount or 0.0)
+
+
+def record_change(db, model, old, new):
+    """Move a row's contribution from `old` to `new`, each a (date, category_id, amount) tuple."""
+    if old == new:
+        return
+    record(db, model, old[0], old[1], -(old[2] or 0.0), -1)
+    record(db, model, new[0], new[1], new[2], 1)
+
+
+def record_many(db, model, rows):
+    """Add many new rows (dicts with date, category_id, amount) with one executemany."""
+    acc = defaultdict(lambda: [0.0, 0])
+    for r in rows:
+        slot = acc[(r["date"], r.get("category_id") or NO_CATEGORY)]
+        slot[0] += r.get("amount") or 0.0
+        slot[1] += 1
+    if acc:
+        _upsert(db, ROLLUPS[model], [{"date": d, "category_id": c, "total": t, "count": n} for (d, c), (t, n) in acc.items()])
+        note_delta(db, KINDS[model], sum(t for t, _ in acc.values()))
+
+
+def move_category(db, source_id: int, target_id: int):
+    """Fold the source category's rollups into the target (category merge)."""
+    for rollup in ROLLUPS.values():
+        rows = db.query(rollup.date, rollup.total, rollup.count).filter(rollup.category_id == source_id).all()
+        if not rows:
+            continue
+        db.execute(delete(rollup.__table__).where(rollup.__table__.c.category_id == source_id))
+        _upsert(db, rollup, [{"date": d, "category_id": target_id, "total": t, "count": n} for d, t, n in rows])
+
+
+def rebuild(db):
+    """Recompute all rollups from the raw tables (repairs drift). Works on a Session or Connection; caller commits."""
+    for model, rollup in ROLLUPS.items():
+        table = rollup.__table__
+        category = func.coalesce(model.category_id, NO_CATEGORY)
+        db.execute(delete(table))
+        db.execute(table.insert().from_select(
+            ["date", "category_id", "total", "count"],
+            select(model.date, category, func.sum(model.amount), func.count(model.id)).group_by(model.date, category),
+        ))
+    note_stale(db)
+
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from typing import Optional
+import query_stats
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get('/slow_queries')
+def list_slow_queries(limit: Optional[int] = 50):
+    """Most recent statements slower than FINANCE_SLOW_QUERY_MS, newest first."""
+    items = list(query_stats.slow_queries)[::-1]
+    return {"threshold_ms": query_stats.SLOW_QUERY_MS, "items": items[:limit]}
+
+
+@router.delete('/slow_queries')
+def clear_slow_queries():
+    query_stats.slow_queries.clear()
+    return {"ok": True}
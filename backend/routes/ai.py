@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, BackgroundTasks
 from pydantic import BaseModel
-from typing import Optional
-from database import get_db
+from typing import List, Optional
+from database import AsyncDB, get_async_db, get_db
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-import ai_service, models, schemas
+import ai_service, models, schemas, online_stats, recurring_detection, metrics
+from normalizer import normalize_merchant
+from merchant_index import merchant_index, FUZZY_THRESHOLD
 from datetime import date, timedelta
 from sqlalchemy import func
-import difflib
-import re
 from fastapi import Body
 from typing import Optional
 
@@ -23,77 +24,86 @@ class PredictionRequest(BaseModel):
     date: Optional[date] = None
 
 
+RECURRING_WINDOW_DAYS = 90
+MAX_BATCH_SIZE = 50000
+
+
+def _category_ids(db: Session) -> dict:
+    return {name: cid for cid, name in db.query(models.Category.id, models.Category.name)}
+
+
+def _is_anomaly(db: Session, amount: Optional[float], category: Optional[str], normalized: str) -> bool:
+    """Score `amount` against the running stats of the predicted category and the merchant."""
+    if amount is None:
+        return False
+    category_id = db.query(models.Category.id).filter(models.Category.name == category).scalar() if category else None
+    return online_stats.score(db, amount, category_id, normalized)[0]
+
+
+def _mapping_prediction(mapping, score: Optional[float], anomaly: bool) -> schemas.AIPredictionResponse:
+    """Response for a saved mapping hit: `score` is None for an exact match, else the fuzzy similarity."""
+    if score is None:
+        confidence, explanation = 0.98, "User-corrected mapping"
+    else:
+        confidence, explanation = round(0.9 * score, 2), f"Matched saved mapping (similarity={round(score,2)})"
+    return schemas.AIPredictionResponse(
+        category=mapping.category,
+        confidence=confidence,
+        normalized_merchant=mapping.canonical or mapping.merchant,
+        is_recurring=False,
+        anomaly=anomaly,
+        explanation=explanation
+    )
+
+
 @router.post("/predict_category", response_model=schemas.AIPredictionResponse)
-def predict_category(request: PredictionRequest, db: Session = Depends(get_db)):
+async def predict_category(request: PredictionRequest, db: AsyncDB = Depends(get_async_db)):
     merchant = (request.merchant or "").strip()
     notes = request.notes or ""
 
-    def normalize(s: str) -> str:
-        if not s:
-            return ""
-        s = s.lower().strip()
-        s = re.sub(r"#\d+", "", s)
-        s = re.sub(r"\bno\.?\s*\d+\b", "", s)
-        s = re.sub(r"[^a-z0-9\s]", "", s)
-        s = re.sub(r"\s+", " ", s).strip()
-        return s
+    normalized = normalize_merchant(merchant)
+
+    # Check exact persisted mapping first
+    mapping = await db.run(_exact_mapping, normalized)
+    if mapping and mapping.category:
+        metrics.record_prediction("exact")
+        return _mapping_prediction(mapping, None, await db.run(_is_anomaly, request.amount, mapping.category, normalized))
 
-    def similarity(a: str, b: str) -> float:
-        if not a or not b:
-            return 0.0
-        return difflib.SequenceMatcher(None, a, b).ratio()
+    # Fuzzy match against existing mappings (indexed, only plausible candidates are scored off the event loop)
+    best_id, best_score = await run_in_threadpool(merchant_index.best_match, normalized)
+    return await db.run(_predict_rest, request, merchant, notes, normalized, best_id, best_score)
 
-    normalized = normalize(merchant)
 
-    # Check exact persisted mapping first
+def _exact_mapping(db: Session, normalized: str):
+    """Saved mapping for `normalized`; on a miss also brings the fuzzy index up to date."""
     mapping = db.query(models.MerchantMapping).filter(models.MerchantMapping.merchant == normalized).first()
-    if mapping and mapping.category:
-        return schemas.AIPredictionResponse(
-            category=mapping.category,
-            confidence=0.98,
-            normalized_merchant=mapping.canonical or mapping.merchant,
-            is_recurring=False,
-            anomaly=ai_service.detect_anomaly(request.amount, mapping.category),
-            explanation="User-corrected mapping"
-        )
-
-    # Fuzzy match against existing mappings
-    FUZZY_THRESHOLD = 0.8
-    best = None
-    best_score = 0.0
-    for m in db.query(models.MerchantMapping).all():
-        score = max(similarity(normalized, normalize(m.merchant or "")), similarity(normalized, normalize(m.canonical or "")))
-        if score > best_score:
-            best_score = score
-            best = m
+    if not (mapping and mapping.category):
+        merchant_index.sync(db)
+    return mapping
+
 
+def _predict_rest(db: Session, request: PredictionRequest, merchant: str, notes: str, normalized: str, best_id: Optional[int], best_score: float):
+    best = db.get(models.MerchantMapping, best_id) if best_id is not None else None
     if best and best_score >= FUZZY_THRESHOLD and best.category:
-        conf = round(0.9 * best_score, 2)
-        return schemas.AIPredictionResponse(
-            category=best.category,
-            confidence=conf,
-            normalized_merchant=best.canonical or best.merchant,
-            is_recurring=False,
-            anomaly=ai_service.detect_anomaly(request.amount, best.category),
-            explanation=f"Matched saved mapping (similarity={round(best_score,2)})"
-        )
+        metrics.record_prediction("fuzzy", best_score)
+        return _mapping_prediction(best, best_score, _is_anomaly(db, request.amount, best.category, normalized))
 
     # Ask ai_service for prediction + confidence
     pred_category, confidence, explanation = ai_service.predict_with_confidence(merchant, notes)
+    metrics.record_prediction("heuristic")
 
     # Detect recurring: simple heuristic - count similar merchant occurrences in recent expenses
     is_recurring = False
     try:
         recent_count = db.query(func.count(models.Expense.id)).filter(
-            models.Expense.merchant != None,
-            func.lower(models.Expense.merchant) == normalized,
-            models.Expense.date >= (date.today() - timedelta(days=90))
+            models.Expense.merchant_normalized == normalized,
+            models.Expense.date >= (date.today() - timedelta(days=RECURRING_WINDOW_DAYS))
         ).scalar()
         is_recurring = (recent_count or 0) >= 2
     except Exception:
         is_recurring = False
 
-    anomaly = ai_service.detect_anomaly(request.amount, pred_category)
+    anomaly = _is_anomaly(db, request.amount, pred_category, normalized)
 
     return schemas.AIPredictionResponse(
         category=pred_category,
@@ -105,6 +115,121 @@ def predict_category(request: PredictionRequest, db: Session = Depends(get_db)):
     )
 
 
+@router.post("/predict_category/batch", response_model=List[schemas.AIPredictionResponse])
+async def predict_category_batch(requests: List[PredictionRequest], db: AsyncDB = Depends(get_async_db)):
+    """Categorize many transactions (e.g. a bank statement import) in one call.
+
+    Same result per item as /predict_category, in request order. Mappings are loaded once,
+    identical normalized merchants are resolved once, and recent-occurrence counts for the
+    heuristic fallbacks come from a single grouped query. Fuzzy scoring, the heuristics and
+    building the responses run in the threadpool, between the database steps.
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_BATCH_SIZE} items per batch")
+
+    normalized = [normalize_merchant((r.merchant or "").strip()) for r in requests]
+    unique = set(normalized)
+
+    exact = await db.run(_exact_mappings, list(unique))
+    fuzzy_ids = await run_in_threadpool(_fuzzy_matches, unique, exact)
+    resolved, recent_counts, category_ids = await db.run(_batch_lookups, unique, exact, fuzzy_ids)
+    predicted, keys = await run_in_threadpool(_batch_predictions, requests, normalized, resolved, category_ids)
+    # anomaly flags from the running stats, loaded once for every category/merchant involved
+    stats = await db.run(online_stats.load, keys)
+    return await run_in_threadpool(_batch_responses, requests, normalized, predicted, resolved, recent_counts, category_ids, stats)
+
+
+def _exact_mappings(db: Session, unique: list) -> dict:
+    """Saved mappings by normalized merchant; also brings the fuzzy index up to date."""
+    exact = {}
+    for i in range(0, len(unique), 500):
+        for m in db.query(models.MerchantMapping).filter(models.MerchantMapping.merchant.in_(unique[i:i + 500])):
+            exact.setdefault(m.merchant, m)
+    merchant_index.sync(db)
+    return exact
+
+
+def _fuzzy_matches(unique, exact: dict) -> dict:
+    """normalized -> (mapping id, score) for merchants without an exact mapping that have a fuzzy one."""
+    fuzzy_ids = {}
+    for nm in unique:
+        m = exact.get(nm)
+        if m and m.category:
+            continue
+        mid, score = merchant_index.best_match(nm)
+        if mid is not None:
+            fuzzy_ids[nm] = (mid, score)
+    return fuzzy_ids
+
+
+def _batch_lookups(db: Session, unique, exact: dict, fuzzy_ids: dict):
+    """(resolved mappings, recent occurrence counts of the rest, category ids by name)."""
+    resolved = {nm: (m, None) for nm, m in exact.items() if m.category}  # normalized -> (mapping, score or None)
+    if fuzzy_ids:
+        ids = list({mid for mid, _ in fuzzy_ids.values()})
+        rows = {}
+        for i in range(0, len(ids), 500):
+            for m in db.query(models.MerchantMapping).filter(models.MerchantMapping.id.in_(ids[i:i + 500])):
+                rows[m.id] = m
+        for nm, (mid, score) in fuzzy_ids.items():
+            m = rows.get(mid)
+            if m and m.category:
+                resolved[nm] = (m, score)
+
+    # recent occurrence counts for merchants that fall through to the heuristics
+    fallback = [nm for nm in unique if nm not in resolved]
+    recent_counts = {}
+    since = date.today() - timedelta(days=RECURRING_WINDOW_DAYS)
+    for i in range(0, len(fallback), 500):
+        rows = db.query(models.Expense.merchant_normalized, func.count(models.Expense.id)).filter(
+            models.Expense.merchant_normalized.in_(fallback[i:i + 500]),
+            models.Expense.date >= since
+        ).group_by(models.Expense.merchant_normalized).all()
+        recent_counts.update(rows)
+    return resolved, recent_counts, _category_ids(db)
+
+
+def _batch_predictions(requests, normalized, resolved: dict, category_ids: dict):
+    """Per item (category, heuristic result or None for mapping hits), and the stats keys to load."""
+    heuristics = {}
+    predicted = []
+    for r, nm in zip(requests, normalized):
+        if nm in resolved:
+            predicted.append((resolved[nm][0].category, None))
+            continue
+        merchant = (r.merchant or "").strip()
+        key = (merchant, r.notes or "")
+        if key not in heuristics:
+            heuristics[key] = ai_service.predict_with_confidence(merchant, r.notes or "")
+        predicted.append((heuristics[key][0], heuristics[key]))
+    keys = [
+        k for r, nm, (category, _) in zip(requests, normalized, predicted) if r.amount is not None
+        for k in online_stats.keys_for(category_ids.get(category), nm)
+    ]
+    return predicted, keys
+
+
+def _batch_responses(requests, normalized, predicted, resolved: dict, recent_counts: dict, category_ids: dict, stats):
+    out = []
+    for r, nm, (category, heuristic) in zip(requests, normalized, predicted):
+        anomaly = online_stats.assess(stats, r.amount, category_ids.get(category), nm)[0]
+        if heuristic is None:
+            mapping, score = resolved[nm]
+            metrics.record_prediction("exact" if score is None else "fuzzy", score)
+            out.append(_mapping_prediction(mapping, score, anomaly))
+            continue
+        metrics.record_prediction("heuristic")
+        pred_category, confidence, explanation = heuristic
+        out.append(schemas.AIPredictionResponse(
+            category=pred_category,
+            confidence=confidence,
+            normalized_merchant=nm,
+            is_recurring=(recent_counts.get(nm) or 0) >= 2,
+            anomaly=anomaly,
+            explanation=explanation
+        ))
+    return out
+
 
 class RecurringCheckIn(BaseModel):
     merchant: Optional[str] = None
@@ -113,78 +238,71 @@ class RecurringCheckIn(BaseModel):
 
 
 @router.post('/recurring_check')
-def recurring_check(payload: RecurringCheckIn, db: Session = Depends(get_db)):
-    """Check if the provided merchant/amount looks recurring; returns confidence and suggested next date."""
-    m = (payload.merchant or '').strip()
-    amt = payload.amount
-    d = payload.date or date.today()
-
-    def normalize(s: str) -> str:
-        if not s:
-            return ""
-        s = s.lower().strip()
-        s = re.sub(r"[^a-z0-9\s]", "", s)
-        s = re.sub(r"\s+", " ", s)
-        return s
-
-    nm = normalize(m)
-    # find similar merchants in the last 365 days
-    rows = db.query(models.Expense).filter(models.Expense.merchant != None).all()
-    candidates = []
-    for e in rows:
-        if not e.merchant:
-            continue
-        em = normalize(e.merchant)
-        if nm and em and (difflib.SequenceMatcher(None, nm, em).ratio() >= 0.7):
-            candidates.append(e)
+async def recurring_check(payload: RecurringCheckIn, db: AsyncDB = Depends(get_async_db)):
+    """Check if the provided merchant/amount looks recurring; returns confidence and suggested next date.
 
-    if len(candidates) < 2:
+    Answers from the candidates precomputed by recurring_detection (see /ai/recurring/detect).
+    """
+    nm = normalize_merchant((payload.merchant or '').strip())
+    if not nm:
         return {"is_recurring": False, "confidence": 0.0}
+    return await db.run(_recurring_check, nm)
 
-    # compute intervals between occurrences (sorted by date)
-    dates = sorted([c.date for c in candidates if c.date])
-    intervals = []
-    for i in range(1, len(dates)):
-        intervals.append((dates[i] - dates[i-1]).days)
 
-    if not intervals:
+def _recurring_check(db: Session, nm: str):
+
+    # same merchant: exact normalized match, else a longer name starting with it as a whole word
+    # ("netflix" -> "netflix com"), both served by the merchant index on recurring_tags
+    T = models.RecurringTag
+    tag = db.query(T).filter(T.merchant == nm).order_by(T.confirmed.desc(), T.id).first()
+    if tag is None:
+        tag = db.query(T).filter(T.merchant >= nm + " ", T.merchant < nm + "!").order_by(T.confidence.desc()).first()
+    if tag is None or tag.interval_days is None:
         return {"is_recurring": False, "confidence": 0.0}
 
-    avg_interval = sum(intervals) / len(intervals)
-    # measure regularity: low stddev means regular
-    import statistics
-    try:
-        stdev = statistics.pstdev(intervals)
-    except Exception:
-        stdev = 0.0
+    confidence = 1.0 if tag.confirmed and tag.confidence is None else (tag.confidence or 0.0)
+    return {
+        "is_recurring": bool(tag.confirmed) or confidence >= recurring_detection.RECURRING_CONFIDENCE,
+        "confidence": round(confidence, 2),
+        "avg_interval_days": tag.interval_days,
+        "next_expected": tag.next_expected.isoformat() if tag.next_expected else None,
+    }
+
 
-    # confidence function: more samples and lower stdev increases confidence
-    confidence = min(1.0, max(0.0, (len(intervals) / 12) * (1.0 - (stdev / (avg_interval + 1)))))
+@router.post('/recurring/detect')
+def recurring_detect(background_tasks: BackgroundTasks, wait: bool = False, db: Session = Depends(get_db)):
+    """Recompute recurring candidates for all merchants. Runs after the response unless `wait=true`."""
+    if wait:
+        result = recurring_detection.detect(db)
+        db.commit()
+        return result
+    background_tasks.add_task(_run_recurring_detection, db.get_bind())
+    return {"status": "scheduled"}
 
-    suggested_next = (dates[-1] + timedelta(days=round(avg_interval))) if dates else None
 
-    return {"is_recurring": confidence >= 0.7, "confidence": round(confidence, 2), "avg_interval_days": round(avg_interval, 1), "next_expected": suggested_next.isoformat() if suggested_next else None}
+def _run_recurring_detection(bind):
+    with Session(bind=bind) as db:
+        recurring_detection.detect(db)
+        db.commit()
 
 
 @router.post('/recurring_confirm')
 def recurring_confirm(merchant: str = Body(...), category: str = Body(None), average_amount: float = Body(None), interval_days: int = Body(None), db: Session = Depends(get_db)):
     # create or update a RecurringTag
-    def normalize(s: str) -> str:
-        if not s:
-            return ""
-        s = s.lower().strip()
-        s = re.sub(r"[^a-z0-9\s]", "", s)
-        s = re.sub(r"\s+", " ", s)
-        return s
-
-    nm = normalize(merchant)
+    nm = normalize_merchant(merchant)
     if not nm:
         return {"error": "merchant required"}
 
-    from datetime import date
     next_dt = (date.today() + timedelta(days=interval_days)) if interval_days else None
-    tag = models.RecurringTag(merchant=nm, category=category, average_amount=average_amount, interval_days=interval_days, next_expected=next_dt, confirmed=1)
-    db.add(tag)
+    tag = db.query(models.RecurringTag).filter(models.RecurringTag.merchant == nm).order_by(models.RecurringTag.id).first()
+    if tag is None:
+        tag = models.RecurringTag(merchant=nm)
+        db.add(tag)
+    tag.category = category
+    tag.average_amount = average_amount
+    tag.interval_days = interval_days
+    tag.next_expected = next_dt
+    tag.confirmed = 1
     db.commit()
     return {"message": "recurring tag created", "merchant": nm}
 
@@ -197,22 +315,7 @@ class ConfirmRequest(BaseModel):
 
 @router.post("/confirm_category")
 def confirm_category(req: ConfirmRequest, db: Session = Depends(get_db)):
-    def normalize(s: str) -> str:
-        if not s:
-            return ""
-        s = s.lower().strip()
-        s = re.sub(r"#\d+", "", s)
-        s = re.sub(r"\bno\.?\s*\d+\b", "", s)
-        s = re.sub(r"[^a-z0-9\s]", "", s)
-        s = re.sub(r"\s+", " ", s).strip()
-        return s
-
-    def similarity(a: str, b: str) -> float:
-        if not a or not b:
-            return 0.0
-        return difflib.SequenceMatcher(None, a, b).ratio()
-
-    merchant = normalize(req.merchant)
+    merchant = normalize_merchant(req.merchant)
     if not merchant or not req.category:
         raise HTTPException(status_code=400, detail="merchant and category required")
 
@@ -223,17 +326,11 @@ def confirm_category(req: ConfirmRequest, db: Session = Depends(get_db)):
         if req.canonical:
             mapping.canonical = req.canonical
         db.commit()
+        merchant_index.upsert(mapping)
         return {"message": "mapping updated", "merchant": merchant, "category": req.category}
 
     # Otherwise, try to find a similar existing mapping and create an alias
-    FUZZY_THRESHOLD = 0.8
-    best = None
-    best_score = 0.0
-    for m in db.query(models.MerchantMapping).all():
-        score = max(similarity(merchant, normalize(m.merchant or "")), similarity(merchant, normalize(m.canonical or "")))
-        if score > best_score:
-            best_score = score
-            best = m
+    best, best_score = merchant_index.lookup(db, merchant)
 
     if best and best_score >= FUZZY_THRESHOLD:
         # create alias row pointing to the existing canonical and category
@@ -241,10 +338,12 @@ def confirm_category(req: ConfirmRequest, db: Session = Depends(get_db)):
         alias = models.MerchantMapping(merchant=merchant, canonical=alias_canonical, category=req.category)
         db.add(alias)
         db.commit()
+        merchant_index.upsert(alias)
         return {"message": f"alias created (mapped to existing canonical, similarity={round(best_score,2)})", "merchant": merchant, "mapped_to": alias_canonical}
 
     # No similar mapping found -> create new mapping
     mapping = models.MerchantMapping(merchant=merchant, canonical=(req.canonical or merchant), category=req.category, notes=None)
     db.add(mapping)
     db.commit()
+    merchant_index.upsert(mapping)
     return {"message": "mapping saved", "merchant": merchant, "category": req.category}
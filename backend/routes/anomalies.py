@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from database import get_db
-import models, ai_service
+import models, anomaly_scoring
 from datetime import date, timedelta
 from typing import Optional
 
@@ -33,21 +33,10 @@ def list_anomalies(include_dismissed: Optional[bool] = False, db: Session = Depe
 
 @router.post('/scan')
 def scan_recent_for_anomalies(days: int = 30, db: Session = Depends(get_db)):
-    since = date.today() - timedelta(days=days)
-    expenses = db.query(models.Expense).filter(models.Expense.date >= since).all()
-    created = 0
-    for e in expenses:
-        score_bool = ai_service.detect_anomaly(e.amount, e.category.name if e.category else None)
-        score = 1.0 if score_bool else 0.0
-        if score > 0:
-            # create an anomaly log if not already exists for this expense
-            exists = db.query(models.AnomalyLog).filter(models.AnomalyLog.expense_id == e.id).first()
-            if not exists:
-                al = models.AnomalyLog(expense_id=e.id, amount=e.amount, category=(e.category.name if e.category else None), score=score, message='Automatic anomaly detection')
-                db.add(al)
-                created += 1
+    """Score the last `days` days of expenses against per-category history and log new anomalies."""
+    result = anomaly_scoring.scan(db, days=days)
     db.commit()
-    return {"created": created}
+    return result
 
 
 @router.post('/{anomaly_id}/dismiss')
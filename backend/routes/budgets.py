@@ -3,9 +3,10 @@ from sqlalchemy.orm import Session
 from typing import List
 from datetime import date, timedelta, datetime
 import calendar
-from database import get_db
+from database import AsyncDB, get_async_db, get_db
 import models, schemas
-from sqlalchemy import func
+from sqlalchemy import func, case, and_
+from sqlalchemy.orm import selectinload
 
 router = APIRouter(
     prefix="/budgets",
@@ -78,12 +79,15 @@ def delete_budget(budget_id: int, db: Session = Depends(get_db)):
     return {"message": "Budget deleted successfully"}
 
 @router.get("/", response_model=List[schemas.Budget])
-def read_budgets(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    budgets = db.query(models.Budget).offset(skip).limit(limit).all()
-    return budgets
+async def read_budgets(skip: int = 0, limit: int = 100, db: AsyncDB = Depends(get_async_db)):
+    return await db.run(_read_budgets, skip, limit)
 
-def get_date_range(period_type: str, start_date: date):
-    today = date.today()
+
+def _read_budgets(db: Session, skip: int, limit: int):
+    return db.query(models.Budget).options(selectinload(models.Budget.category)).offset(skip).limit(limit).all()
+
+def get_date_range(period_type: str, start_date: date, today: date = None):
+    today = today or date.today()
     if period_type == "monthly":
         # Assume budget applies to the current month of the start_date, or just the current month?
         # Requirement: "Set monthly/weekly budgets".
@@ -103,25 +107,55 @@ def get_date_range(period_type: str, start_date: date):
     return today, today
 
 @router.get("/status", response_model=List[schemas.BudgetStatus])
-def get_budgets_status(db: Session = Depends(get_db)):
-    budgets = db.query(models.Budget).all()
+async def get_budgets_status(db: AsyncDB = Depends(get_async_db)):
+    return await db.run(_budgets_status)
+
+
+def _budgets_status(db: Session, today: date = None):
+    budgets = db.query(models.Budget).options(selectinload(models.Budget.category)).all()
     status_list = []
+    if not budgets:
+        return status_list
     
-    today = date.today()
+    today = today or date.today()
 
+    # Distinct periods across all budgets (at most monthly, weekly, and the single-day fallback)
+    periods = {}
     for budget in budgets:
-        period_start, period_end = get_date_range(budget.period_type, budget.start_date)
-        
-        # Query expenses
-        query = db.query(func.sum(models.Expense.amount)).filter(
-            models.Expense.date >= period_start,
-            models.Expense.date <= period_end
+        periods.setdefault(get_date_range(budget.period_type, budget.start_date, today), len(periods))
+
+    # Spend per period comes from the daily rollups
+    R = models.ExpenseDailyRollup
+
+    def in_window(query):
+        return query.filter(
+            R.date >= min(p[0] for p in periods),
+            R.date <= max(p[1] for p in periods)
         )
-        
+
+    columns = [
+        func.sum(case((and_(R.date >= start, R.date <= end), R.total)))
+        for start, end in periods
+    ]
+
+    # One grouped query for category budgets, one ungrouped query for overall budgets
+    by_category = {}
+    if any(b.category_id for b in budgets):
+        rows = in_window(db.query(R.category_id, *columns)).group_by(R.category_id).all()
+        by_category = {row[0]: row[1:] for row in rows}
+    overall = None
+    if any(not b.category_id for b in budgets):
+        overall = in_window(db.query(*columns)).one()
+
+    for budget in budgets:
+        period_start, period_end = get_date_range(budget.period_type, budget.start_date, today)
+        slot = periods[(period_start, period_end)]
         if budget.category_id:
-            query = query.filter(models.Expense.category_id == budget.category_id)
-        
-        spent = query.scalar() or 0.0
+            sums = by_category.get(budget.category_id)
+            spent = (sums[slot] if sums else None) or 0.0
+        else:
+            spent = overall[slot] or 0.0
+
         remaining = budget.amount - spent
         utilization_pct = (spent / budget.amount) * 100 if budget.amount > 0 else 0.0
         is_over_budget = spent > budget.amount
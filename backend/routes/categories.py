@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
 import models, schemas
+import rollups
+import online_stats
 from typing import List
 
 router = APIRouter(
@@ -55,6 +57,9 @@ def merge_categories(merge_data: schemas.CategoryMerge, db: Session = Depends(ge
     # Move income
     updated_income = db.query(models.Income).filter(models.Income.category_id == merge_data.source_id).update({"category_id": merge_data.target_id})
     print(f"Moved {updated_income} income records")
+
+    rollups.move_category(db, merge_data.source_id, merge_data.target_id)
+    online_stats.merge_category(db, merge_data.source_id, merge_data.target_id)
     
     # Delete source category
     db.delete(source_cat)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 import models, schemas
-from database import get_db
+from database import AsyncDB, get_async_db, get_db
+import bulk_ingest
+import pagination
+import rollups
+import online_stats
 
 router = APIRouter(
     prefix="/expenses",
@@ -13,21 +17,74 @@ router = APIRouter(
 def create_expense(expense: schemas.ExpenseCreate, db: Session = Depends(get_db)):
     db_expense = models.Expense(**expense.dict())
     db.add(db_expense)
+    rollups.record(db, models.Expense, db_expense.date, db_expense.category_id, db_expense.amount)
+    # score against history before this amount joins it
+    is_anomaly, score, scope, typical = online_stats.score(db, db_expense.amount, db_expense.category_id, db_expense.merchant_normalized)
+    online_stats.observe(db, db_expense.category_id, db_expense.merchant_normalized, db_expense.amount)
+    if is_anomaly:
+        db.flush()
+        category = db.get(models.Category, db_expense.category_id) if db_expense.category_id else None
+        category_name = category.name if category else None
+        if scope == online_stats.MERCHANT:
+            label = db_expense.merchant
+        else:
+            label = category_name or "uncategorized"
+        db.add(models.AnomalyLog(
+            expense_id=db_expense.id,
+            amount=db_expense.amount,
+            category=category_name,
+            score=score,
+            message=f"Unusually high for {label} (typical {typical})" if typical is not None else "Amount above fixed threshold",
+        ))
     db.commit()
     db.refresh(db_expense)
     return db_expense
 
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def bulk_create_expenses(request: Request, chunk_size: int = bulk_ingest.DEFAULT_CHUNK_SIZE, all_or_nothing: bool = False, db: Session = Depends(get_db)):
+    """Insert many rows in one transaction from a JSON array or a streamed application/x-ndjson body.
+
+    Invalid rows (schema errors, unknown category_id) are skipped and reported by index;
+    with `all_or_nothing=true` any error rolls back the whole batch.
+    """
+    return await bulk_ingest.ingest_request(request, db, models.Expense, schemas.ExpenseCreate, chunk_size, all_or_nothing)
+
 @router.get("/", response_model=List[schemas.Expense])
-def read_expenses(
+async def read_expenses(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     start_date: str = None,
     end_date: str = None,
     category_id: int = None,
     merchant: str = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncDB = Depends(get_async_db)
 ):
+    """List expenses newest first.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to get the following page
+    (`skip` is ignored then). `fields=id,date,amount` returns only those keys per row.
+    """
+    names = pagination.parse_fields(fields, schemas.Expense)
+    expenses = await db.run(_list_expenses, names, skip, limit, start_date, end_date, category_id, merchant, cursor)
+
+    next_cursor = pagination.next_cursor(expenses, limit)
+    headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if names:
+        return pagination.projected_response(expenses, names, headers)
+    response.headers.update(headers)
+    return expenses
+
+
+def _list_expenses(db: Session, names, skip, limit, start_date, end_date, category_id, merchant, cursor):
     query = db.query(models.Expense)
+    if names:
+        query = pagination.project(query, models.Expense, names)
+    else:
+        # one IN query for the page's categories instead of a lazy load per row
+        query = query.options(selectinload(models.Expense.category))
 
     if start_date:
         query = query.filter(models.Expense.date >= start_date)
@@ -38,8 +95,10 @@ def read_expenses(
     if merchant:
         query = query.filter(models.Expense.merchant.ilike(f"%{merchant}%"))
 
-    expenses = query.order_by(models.Expense.date.desc()).offset(skip).limit(limit).all()
-    return expenses
+    query = pagination.ordered(query, models.Expense, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    return query.limit(limit).all()
 
 @router.delete("/{expense_id}")
 def delete_expense(expense_id: int, db: Session = Depends(get_db)):
@@ -47,6 +106,8 @@ def delete_expense(expense_id: int, db: Session = Depends(get_db)):
     if db_expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     db.delete(db_expense)
+    rollups.record(db, models.Expense, db_expense.date, db_expense.category_id, -(db_expense.amount or 0.0), -1)
+    online_stats.forget(db, db_expense.category_id, db_expense.merchant_normalized, db_expense.amount)
     db.commit()
     return {"ok": True}
 
@@ -56,8 +117,15 @@ def update_expense(expense_id: int, expense: schemas.ExpenseCreate, db: Session
     if db_expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     
+    before = (db_expense.date, db_expense.category_id, db_expense.amount)
+    stats_before = (db_expense.category_id, db_expense.merchant_normalized, db_expense.amount)
     for key, value in expense.dict().items():
         setattr(db_expense, key, value)
+    rollups.record_change(db, models.Expense, before, (db_expense.date, db_expense.category_id, db_expense.amount))
+    stats_after = (db_expense.category_id, db_expense.merchant_normalized, db_expense.amount)
+    if stats_after != stats_before:
+        online_stats.forget(db, *stats_before)
+        online_stats.observe(db, *stats_after)
     
     db.commit()
     db.refresh(db_expense)
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import date, datetime, timedelta
-from sqlalchemy import func
 from database import get_db
+from savings_rate import savings_rate
 import models, schemas
 
 router = APIRouter(
@@ -27,6 +27,17 @@ def list_goals(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return goals
 
 
+@router.get("/progress", response_model=List[schemas.GoalProgress])
+def all_goals_progress(db: Session = Depends(get_db)):
+    """Progress of every goal in one call, same fields as /goals/{goal_id}/progress.
+
+    The recent savings rate is computed once (and shared across requests, see savings_rate).
+    """
+    today = date.today()
+    monthly_net = savings_rate.monthly_net(db, today)
+    return [_progress(g, monthly_net, today) for g in db.query(models.Goal).order_by(models.Goal.id)]
+
+
 @router.get("/{goal_id}", response_model=schemas.Goal)
 def get_goal(goal_id: int, db: Session = Depends(get_db)):
     g = db.query(models.Goal).filter(models.Goal.id == goal_id).first()
@@ -81,7 +92,12 @@ def goal_progress(goal_id: int, db: Session = Depends(get_db)):
     g = db.query(models.Goal).filter(models.Goal.id == goal_id).first()
     if not g:
         raise HTTPException(status_code=404, detail="Goal not found")
+    today = date.today()
+    return _progress(g, savings_rate.monthly_net(db, today), today)
+
 
+def _progress(g: models.Goal, monthly_net: float, today: date) -> schemas.GoalProgress:
+    """Progress, ETA at the recent net savings rate and behind-schedule nudge for one goal."""
     target = g.target_amount or 0.0
     current = g.current_amount or 0.0
     progress_pct = (current / target) * 100 if target > 0 else 0.0
@@ -90,20 +106,8 @@ def goal_progress(goal_id: int, db: Session = Depends(get_db)):
     message = None
     is_completed = False
     if g.deadline:
-        delta = (g.deadline - date.today()).days
+        delta = (g.deadline - today).days
         days_left = delta
-    # Compute recent net savings (income - expenses) to estimate completion
-    window_days = 90
-    since_date = date.today() - timedelta(days=window_days)
-    try:
-        income_sum = db.query(models.Income).with_entities(func.coalesce(func.sum(models.Income.amount), 0)).filter(models.Income.date >= since_date).scalar() or 0.0
-        expense_sum = db.query(models.Expense).with_entities(func.coalesce(func.sum(models.Expense.amount), 0)).filter(models.Expense.date >= since_date).scalar() or 0.0
-    except Exception:
-        income_sum = 0.0
-        expense_sum = 0.0
-
-    total_net = (income_sum or 0.0) - (expense_sum or 0.0)
-    monthly_net = (total_net / window_days) * 30 if window_days > 0 else 0.0
 
     estimated_completion_date = None
     projected_months = None
@@ -113,7 +117,7 @@ def goal_progress(goal_id: int, db: Session = Depends(get_db)):
         if projected_months is not None:
             try:
                 est_days = int(projected_months * 30)
-                estimated_completion_date = date.today() + timedelta(days=est_days)
+                estimated_completion_date = today + timedelta(days=est_days)
             except Exception:
                 estimated_completion_date = None
 
@@ -124,7 +128,7 @@ def goal_progress(goal_id: int, db: Session = Depends(get_db)):
         try:
             created_date = g.created_at.date() if isinstance(g.created_at, datetime) else g.created_at
             total_days = (g.deadline - created_date).days
-            elapsed_days = (date.today() - created_date).days
+            elapsed_days = (today - created_date).days
             if total_days > 0 and elapsed_days > 0:
                 expected_ratio = min(1.0, max(0.0, elapsed_days / total_days))
                 expected_amount = target * expected_ratio
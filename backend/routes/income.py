@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
 import models, schemas
 from database import get_db
+import bulk_ingest
+import pagination
+import rollups
 
 router = APIRouter(
     prefix="/income",
@@ -13,21 +16,37 @@ router = APIRouter(
 def create_income(income: schemas.IncomeCreate, db: Session = Depends(get_db)):
     db_income = models.Income(**income.dict())
     db.add(db_income)
+    rollups.record(db, models.Income, db_income.date, db_income.category_id, db_income.amount)
     db.commit()
     db.refresh(db_income)
     return db_income
 
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def bulk_create_income(request: Request, chunk_size: int = bulk_ingest.DEFAULT_CHUNK_SIZE, all_or_nothing: bool = False, db: Session = Depends(get_db)):
+    """Bulk variant of POST /income/, same body formats and error reporting as /expenses/bulk."""
+    return await bulk_ingest.ingest_request(request, db, models.Income, schemas.IncomeCreate, chunk_size, all_or_nothing)
+
 @router.get("/", response_model=List[schemas.Income])
 def read_income(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     start_date: str = None, 
     end_date: str = None, 
     category_id: int = None, 
     source: str = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
+    """List income newest first; `cursor` and `fields` work as on GET /expenses/."""
+    names = pagination.parse_fields(fields, schemas.Income)
     query = db.query(models.Income)
+    if names:
+        query = pagination.project(query, models.Income, names)
+    else:
+        # one IN query for the page's categories instead of a lazy load per row
+        query = query.options(selectinload(models.Income.category))
     
     if start_date:
         query = query.filter(models.Income.date >= start_date)
@@ -38,7 +57,16 @@ def read_income(
     if source:
         query = query.filter(models.Income.source.ilike(f"%{source}%"))
         
-    income = query.order_by(models.Income.date.desc()).offset(skip).limit(limit).all()
+    query = pagination.ordered(query, models.Income, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    income = query.limit(limit).all()
+
+    next_cursor = pagination.next_cursor(income, limit)
+    headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if names:
+        return pagination.projected_response(income, names, headers)
+    response.headers.update(headers)
     return income
 
 @router.delete("/{income_id}")
@@ -47,6 +75,7 @@ def delete_income(income_id: int, db: Session = Depends(get_db)):
     if db_income is None:
         raise HTTPException(status_code=404, detail="Income not found")
     db.delete(db_income)
+    rollups.record(db, models.Income, db_income.date, db_income.category_id, -(db_income.amount or 0.0), -1)
     db.commit()
     return {"ok": True}
 
@@ -56,8 +85,10 @@ def update_income(income_id: int, income: schemas.IncomeCreate, db: Session = De
     if db_income is None:
         raise HTTPException(status_code=404, detail="Income not found")
     
+    before = (db_income.date, db_income.category_id, db_income.amount)
     for key, value in income.dict().items():
         setattr(db_income, key, value)
+    rollups.record_change(db, models.Income, before, (db_income.date, db_income.category_id, db_income.amount))
     
     db.commit()
     db.refresh(db_income)
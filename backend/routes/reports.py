@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
 import models
-from database import get_db
+from database import AsyncDB, get_async_db
+from summary_cache import summary_cache, etag
 from datetime import date, datetime
 import calendar
-from fastapi.responses import StreamingResponse, HTMLResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 import io
 import csv
-import pandas as pd
+import html
+import json
+import tempfile
 from typing import List, Optional
 
 router = APIRouter(
@@ -17,24 +21,32 @@ router = APIRouter(
 )
 
 @router.get("/summary")
-def get_summary(db: Session = Depends(get_db)):
-    total_expense = db.query(func.sum(models.Expense.amount)).scalar() or 0.0
-    total_income = db.query(func.sum(models.Income.amount)).scalar() or 0.0
+async def get_summary(if_none_match: Optional[str] = Header(None), db: AsyncDB = Depends(get_async_db)):
+    """Lifetime totals from the in-memory running counters (see summary_cache), with an ETag for cheap polling."""
+    total_expense, total_income = await db.run(summary_cache.totals)
+    tag = etag(total_expense, total_income)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if if_none_match == tag:
+        return Response(status_code=304, headers=headers)
     balance = total_income - total_expense
-    return {
+    return JSONResponse({
         "total_expense": total_expense,
         "total_income": total_income,
         "balance": balance
-    }
+    }, headers=headers)
 
 
 @router.get('/projected_eom')
-def projected_eom_spend(year: int = None, month: int = None, db: Session = Depends(get_db)):
+async def projected_eom_spend(year: int = None, month: int = None, db: AsyncDB = Depends(get_async_db)):
     """Project end-of-month spend based on month-to-date trend.
 
     If no year/month provided, uses current month. For past months returns actual total (no projection).
     Returns total_so_far, days_elapsed, total_days, projected_total and per-category breakdown.
     """
+    return await db.run(_projected_eom, year, month)
+
+
+def _projected_eom(db: Session, year: Optional[int] = None, month: Optional[int] = None):
     today = date.today()
     if year is None or month is None:
         year = today.year
@@ -51,7 +63,8 @@ def projected_eom_spend(year: int = None, month: int = None, db: Session = Depen
     # sum of expenses from month_start up to either today (if current) or month_end (if past)
     end_date_for_sum = today if is_current_month else month_end
 
-    total_so_far = db.query(func.sum(models.Expense.amount)).filter(models.Expense.date >= month_start, models.Expense.date <= end_date_for_sum).scalar() or 0.0
+    R = models.ExpenseDailyRollup
+    total_so_far = db.query(func.sum(R.total)).filter(R.date >= month_start, R.date <= end_date_for_sum).scalar() or 0.0
 
     # days elapsed in period used for trend
     if is_current_month:
@@ -66,7 +79,7 @@ def projected_eom_spend(year: int = None, month: int = None, db: Session = Depen
         projected_total = total_so_far
 
     # per-category breakdown
-    cat_rows = db.query(models.Category.name, func.sum(models.Expense.amount)).join(models.Expense, models.Expense.category_id == models.Category.id).filter(models.Expense.date >= month_start, models.Expense.date <= end_date_for_sum).group_by(models.Category.name).all()
+    cat_rows = db.query(models.Category.name, func.sum(R.total)).join(R, R.category_id == models.Category.id).filter(R.date >= month_start, R.date <= end_date_for_sum).group_by(models.Category.name).all()
     per_category = []
     for cat_name, cat_sum in cat_rows:
         cat_sum = cat_sum or 0.0
@@ -87,11 +100,35 @@ def projected_eom_spend(year: int = None, month: int = None, db: Session = Depen
     }
 
 
+def _parse_category_ids(category_ids: Optional[str]) -> List[int]:
+    if not category_ids:
+        return []
+    return [int(x) for x in category_ids.split(',') if x.strip().isdigit()]
+
+
+def _apply_expense_filters(q, ids: List[int], merchant: Optional[str], min_amount: Optional[float], max_amount: Optional[float]):
+    """Apply the shared report filters (category ids, merchant substring, amount bounds) to an Expense query."""
+    if ids:
+        q = q.filter(models.Expense.category_id.in_(ids))
+    if merchant:
+        q = q.filter(models.Expense.merchant.ilike(f"%{merchant}%"))
+    if min_amount is not None:
+        q = q.filter(models.Expense.amount >= min_amount)
+    if max_amount is not None:
+        q = q.filter(models.Expense.amount <= max_amount)
+    return q
+
+
 @router.get('/month')
-def monthly_report(year: int = None, month: int = None, category_ids: Optional[str] = None, merchant: Optional[str] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None, db: Session = Depends(get_db)):
+async def monthly_report(year: int = None, month: int = None, category_ids: Optional[str] = None, merchant: Optional[str] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None, db: AsyncDB = Depends(get_async_db)):
     """Return category totals, top merchants and daily trend for a given month and optional filters.
     `category_ids` is comma separated list of category ids to include.
+    All aggregates (count, categories, merchants, daily trend) honour the same filters.
     """
+    return await db.run(_monthly_report, year, month, category_ids, merchant, min_amount, max_amount)
+
+
+def _monthly_report(db: Session, year: Optional[int] = None, month: Optional[int] = None, category_ids: Optional[str] = None, merchant: Optional[str] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None):
     today = date.today()
     if year is None or month is None:
         year = today.year
@@ -101,47 +138,48 @@ def monthly_report(year: int = None, month: int = None, category_ids: Optional[s
     _, total_days = calendar.monthrange(year, month)
     month_end = date(year, month, total_days)
 
-    q = db.query(models.Expense).filter(models.Expense.date >= month_start, models.Expense.date <= month_end)
-    if category_ids:
-        ids = [int(x) for x in category_ids.split(',') if x.strip().isdigit()]
-        if ids:
-            q = q.filter(models.Expense.category_id.in_(ids))
-    if merchant:
-        q = q.filter(models.Expense.merchant.ilike(f"%{merchant}%"))
-    if min_amount is not None:
-        q = q.filter(models.Expense.amount >= min_amount)
-    if max_amount is not None:
-        q = q.filter(models.Expense.amount <= max_amount)
+    ids = _parse_category_ids(category_ids)
+
+    def filtered(*entities):
+        q = db.query(*entities).select_from(models.Expense).filter(models.Expense.date >= month_start, models.Expense.date <= month_end)
+        return _apply_expense_filters(q, ids, merchant, min_amount, max_amount)
 
-    expenses = q.all()
+    # category/date-only filters can be answered from the daily rollups;
+    # merchant and amount filters need the raw rows
+    use_rollups = not merchant and min_amount is None and max_amount is None
+    R = models.ExpenseDailyRollup
 
-    # category totals
-    cat_totals = db.query(models.Category.name, func.sum(models.Expense.amount)).join(models.Expense, models.Expense.category_id == models.Category.id).filter(models.Expense.date >= month_start, models.Expense.date <= month_end)
-    if category_ids:
-        ids = [int(x) for x in category_ids.split(',') if x.strip().isdigit()]
+    def rolled(*entities):
+        q = db.query(*entities).select_from(R).filter(R.date >= month_start, R.date <= month_end)
         if ids:
-            cat_totals = cat_totals.filter(models.Expense.category_id.in_(ids))
+            q = q.filter(R.category_id.in_(ids))
+        return q
+
+    # expense count and category totals
+    if use_rollups:
+        expenses_count = rolled(func.sum(R.count)).scalar() or 0
+        cat_totals = rolled(models.Category.name, func.sum(R.total)).join(models.Category, R.category_id == models.Category.id)
+    else:
+        expenses_count = filtered(func.count(models.Expense.id)).scalar() or 0
+        cat_totals = filtered(models.Category.name, func.sum(models.Expense.amount)).join(models.Category, models.Expense.category_id == models.Category.id)
     cat_totals = cat_totals.group_by(models.Category.name).all()
     categories = [{"category": name, "total": total or 0.0} for name, total in cat_totals]
 
     # top merchants
-    merchant_rows = db.query(models.Expense.merchant, func.sum(models.Expense.amount)).filter(models.Expense.date >= month_start, models.Expense.date <= month_end)
-    if merchant:
-        merchant_rows = merchant_rows.filter(models.Expense.merchant.ilike(f"%{merchant}%"))
+    merchant_rows = filtered(models.Expense.merchant, func.sum(models.Expense.amount))
     merchant_rows = merchant_rows.group_by(models.Expense.merchant).order_by(func.sum(models.Expense.amount).desc()).limit(10).all()
     top_merchants = [{"merchant": m or "", "total": s or 0.0} for m, s in merchant_rows]
 
-    # daily trend
+    # daily trend: one grouped query, days without expenses filled with zero
+    if use_rollups:
+        day_rows = rolled(R.date, func.sum(R.total)).group_by(R.date).all()
+    else:
+        day_rows = filtered(models.Expense.date, func.sum(models.Expense.amount)).group_by(models.Expense.date).all()
+    day_totals = {d: s or 0.0 for d, s in day_rows}
     daily = []
     for d in range(1, total_days + 1):
         day = date(year, month, d)
-        day_sum = db.query(func.sum(models.Expense.amount)).filter(models.Expense.date == day)
-        if category_ids:
-            ids = [int(x) for x in category_ids.split(',') if x.strip().isdigit()]
-            if ids:
-                day_sum = day_sum.filter(models.Expense.category_id.in_(ids))
-        s = day_sum.scalar() or 0.0
-        daily.append({"date": day.isoformat(), "total": s})
+        daily.append({"date": day.isoformat(), "total": day_totals.get(day, 0.0)})
 
     return {
         "year": year,
@@ -149,58 +187,258 @@ def monthly_report(year: int = None, month: int = None, category_ids: Optional[s
         "categories": categories,
         "top_merchants": top_merchants,
         "daily_trend": daily,
-        "expenses_count": len(expenses)
+        "expenses_count": expenses_count
     }
 
 
-@router.get('/export')
-def export_report(format: str = 'csv', year: int = None, month: int = None, category_ids: Optional[str] = None, merchant: Optional[str] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None, db: Session = Depends(get_db)):
-    # reuse monthly_report logic to collect rows
-    report = monthly_report(year=year, month=month, category_ids=category_ids, merchant=merchant, min_amount=min_amount, max_amount=max_amount, db=db)
+EXPORT_COLUMNS = ["date", "merchant", "category", "amount", "notes"]
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_XLSX_SPOOL_BYTES = 8 * 1024 * 1024  # finished workbooks up to this size stay in memory
+EXPORT_FILE_CHUNK_BYTES = 64 * 1024
 
-    # Build flat rows for export: date, merchant, category, amount
-    month = report.get('month')
-    year = report.get('year')
-    month_start = date(year, month, 1)
+
+def _export_range(year: Optional[int], month: Optional[int], start_date: Optional[date], end_date: Optional[date]):
+    """Resolve the export window: an explicit start/end range wins, otherwise a single month (default current)."""
+    if start_date or end_date:
+        start = start_date or date.min
+        end = end_date or date.max
+        label = f"{start_date.isoformat() if start_date else 'start'}_{end_date.isoformat() if end_date else 'end'}"
+        return start, end, label
+    today = date.today()
+    if year is None or month is None:
+        year = today.year
+        month = today.month
     _, total_days = calendar.monthrange(year, month)
-    month_end = date(year, month, total_days)
+    return date(year, month, 1), date(year, month, total_days), f"{year}_{month}"
 
-    q = db.query(models.Expense).filter(models.Expense.date >= month_start, models.Expense.date <= month_end)
-    if category_ids:
-        ids = [int(x) for x in category_ids.split(',') if x.strip().isdigit()]
-        if ids:
-            q = q.filter(models.Expense.category_id.in_(ids))
-    if merchant:
-        q = q.filter(models.Expense.merchant.ilike(f"%{merchant}%"))
-    if min_amount is not None:
-        q = q.filter(models.Expense.amount >= min_amount)
-    if max_amount is not None:
-        q = q.filter(models.Expense.amount <= max_amount)
 
-    rows = []
-    for e in q.all():
-        rows.append({
-            "date": e.date.isoformat(),
-            "merchant": e.merchant,
-            "category": (e.category.name if e.category else None),
-            "amount": e.amount,
-            "notes": e.notes
-        })
+def _export_select(start: date, end: date, ids: List[int], merchant: Optional[str], min_amount: Optional[float], max_amount: Optional[float]):
+    """Flat export rows (date, merchant, category, amount, notes); category names come from the join, not a per-row lazy load."""
+    q = select(models.Expense.date, models.Expense.merchant, models.Category.name, models.Expense.amount, models.Expense.notes)
+    q = q.outerjoin(models.Category, models.Expense.category_id == models.Category.id)
+    q = q.filter(models.Expense.date >= start, models.Expense.date <= end)
+    q = _apply_expense_filters(q, ids, merchant, min_amount, max_amount)
+    return q.order_by(models.Expense.date, models.Expense.id).execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS)
+
 
-    df = pd.DataFrame(rows)
+def _export_rows(db: Session, start: date, end: date, ids: List[int], merchant: Optional[str], min_amount: Optional[float], max_amount: Optional[float]):
+    """Yield export tuples from a server-side cursor.
+
+    Uses a dedicated session on the same engine so the cursor outlives the request-scoped one while the
+    response body is being streamed.
+    """
+    stream_db = Session(bind=db.get_bind())
+    try:
+        for row in stream_db.execute(_export_select(start, end, ids, merchant, min_amount, max_amount)):
+            yield tuple(row)
+    finally:
+        stream_db.close()
+
+
+async def _export_batches(async_engine, start: date, end: date, ids: List[int], merchant: Optional[str], min_amount: Optional[float], max_amount: Optional[float]):
+    """Async mode: the same rows in batches of EXPORT_CHUNK_ROWS, from a dedicated aiosqlite connection."""
+    async with async_engine.connect() as conn:
+        result = await conn.stream(_export_select(start, end, ids, merchant, min_amount, max_amount))
+        async for batch in result.partitions():
+            yield [tuple(row) for row in batch]
+
+
+def _fmt_date(d):
+    return d.isoformat() if d else None
+
+
+def _chunked(rows, make_render, header: str = "", footer: str = ""):
+    """Render rows into utf-8 chunks of EXPORT_CHUNK_ROWS rows each.
+
+    `make_render(buf)` returns the per-row writer for the shared text buffer.
+    """
+    buf = io.StringIO()
+    render = make_render(buf)
+    buf.write(header)
+    n = 0
+    for row in rows:
+        render(row)
+        n += 1
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate(0)
+    buf.write(footer)
+    yield buf.getvalue().encode('utf-8')
+
+
+async def _achunked(batches, make_render, header: str = "", footer: str = ""):
+    """`_chunked` over an async iterator of row batches, one chunk per batch."""
+    buf = io.StringIO()
+    render = make_render(buf)
+    buf.write(header)
+    async for batch in batches:
+        for row in batch:
+            render(row)
+        yield buf.getvalue().encode('utf-8')
+        buf.seek(0)
+        buf.truncate(0)
+    buf.write(footer)
+    yield buf.getvalue().encode('utf-8')
+
+
+def _csv_chunks(rows, chunked=_chunked):
+    def make_render(buf):
+        writer = csv.writer(buf, lineterminator='\n')
+
+        def render(row):
+            d, m, c, a, n = row
+            writer.writerow([_fmt_date(d), m, c, a, n])
+        return render
+
+    return chunked(rows, make_render, header=",".join(EXPORT_COLUMNS) + "\n")
+
+
+def _ndjson_chunks(rows, chunked=_chunked):
+    def make_render(buf):
+        def render(row):
+            buf.write(json.dumps(dict(zip(EXPORT_COLUMNS, (_fmt_date(row[0]),) + tuple(row[1:])))))
+            buf.write("\n")
+        return render
+
+    return chunked(rows, make_render)
+
+
+def _html_chunks(rows, title: str, chunked=_chunked):
+    def make_render(buf):
+        def render(row):
+            cells = (_fmt_date(row[0]),) + tuple(row[1:])
+            buf.write("<tr>" + "".join(f"<td>{html.escape('' if v is None else str(v))}</td>" for v in cells) + "</tr>\n")
+        return render
+
+    head = "".join(f"<th>{c}</th>" for c in EXPORT_COLUMNS)
+    header = f"<html><body><h1>{html.escape(title)}</h1><table border=\"1\"><thead><tr>{head}</tr></thead><tbody>\n"
+    return chunked(rows, make_render, header=header, footer="</tbody></table></body></html>")
+
+
+class _XlsxExport:
+    """An xlsx export written row by row in xlsxwriter's constant_memory mode.
+
+    Each worksheet row is flushed to a temp file once the next row starts, so memory stays flat however
+    many rows go through `write`; the finished workbook is spooled to disk past EXPORT_XLSX_SPOOL_BYTES.
+    Per-category counts and totals for the Summary sheet are accumulated in the same pass.
+    """
+
+    def __init__(self):
+        import xlsxwriter  # only xlsx needs it; keeps it out of startup
+
+        self.out = tempfile.SpooledTemporaryFile(max_size=EXPORT_XLSX_SPOOL_BYTES)
+        self.book = xlsxwriter.Workbook(self.out, {"constant_memory": True})
+        self.bold = self.book.add_format({"bold": True})
+        self.date_format = self.book.add_format({"num_format": "yyyy-mm-dd"})
+        self.money_format = self.book.add_format({"num_format": "#,##0.00"})
+        self.sheet = self.book.add_worksheet("Report")
+        for col, width in enumerate((12, 30, 20, 12, 40)):
+            self.sheet.set_column(col, col, width)
+        self.sheet.write_row(0, 0, EXPORT_COLUMNS, self.bold)
+        self.sheet.freeze_panes(1, 0)
+        self.last_row = 0
+        self.categories = {}  # category name (None = uncategorized) -> [count, total]
+
+    def write(self, rows):
+        sheet, categories, date_format, money_format = self.sheet, self.categories, self.date_format, self.money_format
+        r = self.last_row
+        for d, merchant, category, amount, notes in rows:
+            r += 1
+            sheet.write_datetime(r, 0, d, date_format)
+            if merchant is not None:
+                sheet.write_string(r, 1, merchant)
+            if category is not None:
+                sheet.write_string(r, 2, category)
+            sheet.write_number(r, 3, amount, money_format)
+            if notes is not None:
+                sheet.write_string(r, 4, notes)
+            totals = categories.get(category)
+            if totals is None:
+                categories[category] = [1, amount]
+            else:
+                totals[0] += 1
+                totals[1] += amount
+        self.last_row = r
+
+    def close(self):
+        """Finish the workbook and return the file, rewound."""
+        self.sheet.autofilter(0, 0, self.last_row, len(EXPORT_COLUMNS) - 1)
+        summary = self.book.add_worksheet("Summary")
+        summary.set_column(0, 0, 20)
+        summary.set_column(1, 2, 12)
+        summary.write_row(0, 0, ["category", "count", "total"], self.bold)
+        ranked = sorted(self.categories.items(), key=lambda item: -item[1][1])
+        for r, (category, (count, total)) in enumerate(ranked, start=1):
+            summary.write_string(r, 0, category or "Uncategorized")
+            summary.write_number(r, 1, count)
+            summary.write_number(r, 2, round(total, 2), self.money_format)
+        r = len(ranked) + 1
+        summary.write_string(r, 0, "Total", self.bold)
+        summary.write_number(r, 1, sum(count for count, _ in self.categories.values()), self.bold)
+        summary.write_number(r, 2, round(sum(total for _, total in self.categories.values()), 2), self.money_format)
+        self.book.close()
+        self.out.seek(0)
+        return self.out
+
+    def discard(self):
+        self.out.close()
+
+
+def _xlsx_file(rows):
+    export = _XlsxExport()
+    try:
+        export.write(rows)
+        return export.close()
+    except BaseException:
+        export.discard()
+        raise
+
+
+async def _axlsx_file(batches):
+    """Async mode: rows come off the event loop's cursor, each batch is written in the threadpool."""
+    export = await run_in_threadpool(_XlsxExport)
+    try:
+        async for batch in batches:
+            await run_in_threadpool(export.write, batch)
+        return await run_in_threadpool(export.close)
+    except BaseException:
+        export.discard()
+        raise
+
+
+def _file_chunks(f):
+    try:
+        yield from iter(lambda: f.read(EXPORT_FILE_CHUNK_BYTES), b"")
+    finally:
+        f.close()
+
+
+@router.get('/export')
+async def export_report(format: str = 'csv', year: int = None, month: int = None, start_date: Optional[date] = None, end_date: Optional[date] = None, category_ids: Optional[str] = None, merchant: Optional[str] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None, db: AsyncDB = Depends(get_async_db)):
+    """Stream the filtered expense rows as csv, ndjson, xlsx or a printable html table.
+
+    Either a single `year`/`month` (default current month) or an arbitrary `start_date`/`end_date` range.
+    csv, ndjson and html are written in chunks straight from the DB cursor, so memory stays flat; xlsx
+    goes from the same cursor through a constant-memory workbook (Report and per-category Summary sheets).
+    """
+    start, end, label = _export_range(year, month, start_date, end_date)
+    ids = _parse_category_ids(category_ids)
+    # async mode reads batches from an aiosqlite cursor on the event loop; sync mode hands the
+    # blocking generator to StreamingResponse, which iterates it in the threadpool
+    if db.is_async:
+        rows, chunked = _export_batches(db.session.bind, start, end, ids, merchant, min_amount, max_amount), _achunked
+    else:
+        rows, chunked = _export_rows(db.session, start, end, ids, merchant, min_amount, max_amount), _chunked
 
     if format == 'csv':
-        stream = io.StringIO()
-        df.to_csv(stream, index=False)
-        stream.seek(0)
-        return StreamingResponse(io.BytesIO(stream.getvalue().encode('utf-8')), media_type='text/csv', headers={"Content-Disposition": f"attachment; filename=report_{year}_{month}.csv"})
+        return StreamingResponse(_csv_chunks(rows, chunked), media_type='text/csv', headers={"Content-Disposition": f"attachment; filename=report_{label}.csv"})
+    elif format == 'ndjson':
+        return StreamingResponse(_ndjson_chunks(rows, chunked), media_type='application/x-ndjson', headers={"Content-Disposition": f"attachment; filename=report_{label}.ndjson"})
     elif format in ('xlsx', 'excel'):
-        out = io.BytesIO()
-        with pd.ExcelWriter(out, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False, sheet_name='Report')
-        out.seek(0)
-        return StreamingResponse(out, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', headers={"Content-Disposition": f"attachment; filename=report_{year}_{month}.xlsx"})
+        # the zip container can't be streamed as it is built: finish the workbook, then stream the file
+        out = await _axlsx_file(rows) if db.is_async else await run_in_threadpool(_xlsx_file, rows)
+        return StreamingResponse(_file_chunks(out), media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', headers={"Content-Disposition": f"attachment; filename=report_{label}.xlsx"})
     else:
-        # return simple HTML table (printable for PDF)
-        html = df.to_html(index=False)
-        return HTMLResponse(content=f"<html><body><h1>Report {year}-{month}</h1>{html}</body></html>")
+        # simple HTML table (printable for PDF)
+        return StreamingResponse(_html_chunks(rows, f"Report {label.replace('_', '-')}", chunked), media_type='text/html')
@@ -0,0 +1,149 @@
+"""Keyword rules for category prediction, compiled into one regex per field.
+
+Rules live in category_rules.json (or the file named by FINANCE_CATEGORY_RULES), in priority order:
+the first rule with a keyword anywhere in its field wins, as the old if-chains did. Keywords are plain
+substrings, like the ``in`` checks they replace.
+
+The keywords of a field are compiled into a prefix trie written as a regex ("s(?:hop|t(?:arbucks|ore))"),
+so `re` dispatches on each character instead of trying every keyword at every position. One search finds
+the leftmost keyword; if its rule isn't the first one, a second trie holding only the higher-priority
+rules' keywords is searched, and so on. That is exact and usually takes one or two scans, and strings
+with no keyword at all (the common case for statement imports) take exactly one.
+
+The file is re-read when its mtime changes (checked at most every RELOAD_CHECK_SECONDS); a file that
+fails to parse is logged and the previous rules stay active.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+RULES_PATH = os.environ.get("FINANCE_CATEGORY_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "category_rules.json"))
+RELOAD_CHECK_SECONDS = 1.0
+FIELDS = ("merchant", "notes")
+NO_PREDICTION = (None, 0.0, "No prediction")
+
+
+def _trie_pattern(words) -> str:
+    """Regex matching any of `words`, factored by common prefixes; longer words win at a position."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class CompiledRules:
+    """Immutable compiled form of a rule table."""
+
+    def __init__(self, table: dict):
+        self.rules = []
+        for i, rule in enumerate(table.get("rules", [])):
+            field = rule.get("field", "merchant")
+            if field not in FIELDS:
+                raise ValueError(f"rule {i}: field must be one of {FIELDS}, got {field!r}")
+            keywords = [k.lower() for k in rule["keywords"] if k]
+            if not keywords:
+                raise ValueError(f"rule {i}: no keywords")
+            self.rules.append((rule["category"], float(rule["confidence"]), rule.get("explanation", ""), field, keywords))
+        self.results = [rule[:3] for rule in self.rules]
+        fallback = table.get("fallback")
+        self.fallback = (fallback["category"], float(fallback["confidence"]), fallback.get("explanation", "")) if fallback else None
+
+        # per field: keyword -> first rule using it, and `below[i]`, the trie of keywords of rules < i
+        self.rule_of = {field: {} for field in FIELDS}
+        self.below = {field: [None] * (len(self.rules) + 1) for field in FIELDS}
+        for field in FIELDS:
+            for i in range(len(self.rules) + 1):
+                words = self.rule_of[field].keys()
+                self.below[field][i] = re.compile(_trie_pattern(words)) if words else None
+                if i < len(self.rules) and self.rules[i][3] == field:
+                    for k in self.rules[i][4]:
+                        self.rule_of[field].setdefault(k, i)
+
+    def _best(self, field: str, text: str, best: Optional[int] = None) -> Optional[int]:
+        """Lowest rule index with a keyword in `text`, if lower than `best`."""
+        below, rule_of = self.below[field], self.rule_of[field]
+        pattern = below[-1 if best is None else best]
+        while pattern is not None:
+            m = pattern.search(text)
+            if m is None:
+                break
+            best = rule_of[m.group()]
+            pattern = below[best]
+        return best
+
+    def match(self, merchant: str, notes: str = ""):
+        """(category, confidence, explanation) of the winning rule, or None."""
+        best = self._best("merchant", merchant.lower()) if merchant else None
+        if notes:
+            # only rules ahead of the merchant hit can still win
+            best = self._best("notes", notes.lower(), best)
+        if best is None:
+            return None
+        return self.results[best]
+
+    def predict(self, merchant: str, notes: str = ""):
+        hit = self.match(merchant, notes)
+        if hit:
+            return hit
+        if self.fallback and merchant and merchant.split():
+            return self.fallback
+        return NO_PREDICTION
+
+
+class RuleEngine:
+    """Loads and hot-reloads a rule file; `rules` is swapped atomically so readers never lock."""
+
+    def __init__(self, path: str = RULES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self.rules = CompiledRules({})
+        self.reload()
+
+    def reload(self) -> bool:
+        """Re-read the rule file. Returns False (keeping the current rules) if it can't be used."""
+        with self._lock:
+            mtime = None
+            try:
+                mtime = os.path.getmtime(self.path)
+                with open(self.path) as f:
+                    compiled = CompiledRules(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning("category rules not (re)loaded from %s: %s", self.path, e)
+                self._mtime = mtime  # don't retry until the file changes again
+                return False
+            self.rules, self._mtime = compiled, mtime
+            return True
+
+    def current(self) -> CompiledRules:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + RELOAD_CHECK_SECONDS
+            try:
+                changed = os.path.getmtime(self.path) != self._mtime
+            except OSError:
+                changed = False
+            if changed:
+                self.reload()
+        return self.rules
+
+
+category_rules = RuleEngine()
@@ -0,0 +1,51 @@
+"""Recent net savings (income - expenses over the last WINDOW_DAYS) for goal progress estimates.
+
+Every goal's ETA uses the same two sums over the daily rollups, so the result is cached for
+CACHE_SECONDS and shared by all requests; a day change always recomputes because the window moves.
+Writes show up once the cache expires, which is fine for an estimate measured in months, so writes
+don't invalidate it. A failed query raises instead of caching a zero rate.
+"""
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+import models
+
+WINDOW_DAYS = 90
+CACHE_SECONDS = float(os.environ.get("FINANCE_SAVINGS_CACHE_SECONDS", "30"))
+
+
+class SavingsRateCache:
+    def __init__(self, window_days: int = WINDOW_DAYS, cache_seconds: float = CACHE_SECONDS):
+        self.window_days = window_days
+        self.cache_seconds = cache_seconds
+        self._lock = threading.Lock()
+        self._value = None  # (today, computed_at, total_net)
+
+    def total_net(self, db, today: date = None) -> float:
+        """Income minus expenses from `today - window_days` on, from the cache when fresh."""
+        today = today or date.today()
+        with self._lock:
+            cached = self._value
+        if cached and cached[0] == today and time.monotonic() - cached[1] < self.cache_seconds:
+            return cached[2]
+        total = self._compute(db, today)
+        with self._lock:
+            self._value = (today, time.monotonic(), total)
+        return total
+
+    def monthly_net(self, db, today: date = None) -> float:
+        """Net savings per 30 days at the recent rate."""
+        return (self.total_net(db, today) / self.window_days) * 30 if self.window_days > 0 else 0.0
+
+    def _compute(self, db, today: date) -> float:
+        since_date = today - timedelta(days=self.window_days)
+        income_sum = db.query(func.coalesce(func.sum(models.IncomeDailyRollup.total), 0)).filter(models.IncomeDailyRollup.date >= since_date).scalar()
+        expense_sum = db.query(func.coalesce(func.sum(models.ExpenseDailyRollup.total), 0)).filter(models.ExpenseDailyRollup.date >= since_date).scalar()
+        return (income_sum or 0.0) - (expense_sum or 0.0)
+
+
+savings_rate = SavingsRateCache()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 
 class CategoryBase(BaseModel):
@@ -35,6 +35,15 @@ class Expense(ExpenseBase):
     class Config:
         from_attributes = True
 
+class BulkRowError(BaseModel):
+    index: int
+    error: str
+
+class BulkResult(BaseModel):
+    inserted: int
+    rejected: int
+    errors: List[BulkRowError] = []
+
 class IncomeBase(BaseModel):
     amount: float
     date: date
@@ -0,0 +1,148 @@
+"""Lifetime totals for /reports/summary, served from memory.
+
+The totals are running counters: rollups.record/record_many note each write's amount delta on the
+session, and the deltas are applied here only once that session commits (dropped on rollback).
+Writes made by other processes (extra uvicorn workers, scripts) are not seen as deltas, so the
+counters are also checked against a full SUM over the raw tables every RECOMPUTE_SECONDS.
+
+A SUM is only stored if no local write committed while it ran: every commit carrying deltas bumps a
+generation counter when it starts and when its deltas are applied, and a recompute that sees the
+generation move (or a commit in flight) is retried, then given up in favour of the running counters.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+RECOMPUTE_SECONDS = float(os.environ.get("FINANCE_SUMMARY_RECOMPUTE_SECONDS", "30"))
+
+RECOMPUTE_ATTEMPTS = 3
+
+DELTAS_KEY = "summary_deltas"
+STALE_KEY = "summary_stale"
+WRITING_KEY = "summary_writing"
+
+
+class SummaryCache:
+    def __init__(self, recompute_seconds: float = RECOMPUTE_SECONDS):
+        self.recompute_seconds = recompute_seconds
+        self._lock = threading.Lock()
+        self._expense = None
+        self._income = None
+        self._checked_at = 0.0
+        self._generation = 0
+        self._writing = 0  # commits between before_commit and their apply/rollback
+
+    def totals(self, db):
+        """Return (total_expense, total_income), recomputing if never loaded, invalidated or due for a check."""
+        with self._lock:
+            due = self._expense is None or time.monotonic() - self._checked_at >= self.recompute_seconds
+        if due:
+            return self.recompute(db)
+        with self._lock:
+            return self._expense, self._income
+
+    def recompute(self, db):
+        """SUM the raw tables and store the result unless a local commit raced with it; returns the totals to serve."""
+        for _ in range(RECOMPUTE_ATTEMPTS):
+            with self._lock:
+                generation, writing = self._generation, self._writing
+            expense = db.query(func.sum(models.Expense.amount)).scalar() or 0.0
+            income = db.query(func.sum(models.Income.amount)).scalar() or 0.0
+            with self._lock:
+                if writing or generation != self._generation:
+                    continue
+                if self._expense is not None and (abs(self._expense - expense) > 0.005 or abs(self._income - income) > 0.005):
+                    logger.info("summary counters drifted (expense %s -> %s, income %s -> %s)", self._expense, expense, self._income, income)
+                self._expense, self._income = expense, income
+                self._checked_at = time.monotonic()
+                return expense, income
+        with self._lock:
+            if self._expense is None:
+                # nothing to fall back on: serve this SUM once, but don't keep it
+                return expense, income
+            self._checked_at = time.monotonic()
+            return self._expense, self._income
+
+    def begin_write(self):
+        with self._lock:
+            self._generation += 1
+            self._writing += 1
+
+    def end_write(self):
+        with self._lock:
+            self._generation += 1
+            self._writing -= 1
+
+    def apply(self, expense_delta: float, income_delta: float):
+        with self._lock:
+            self._generation += 1
+            if self._expense is None:
+                return
+            self._expense += expense_delta
+            self._income += income_delta
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._expense = self._income = None
+
+
+summary_cache = SummaryCache()
+
+
+def note_delta(db, kind: str, amount: float):
+    """Queue an amount change ('expense' or 'income') to apply when `db` commits."""
+    if isinstance(db, Session):
+        deltas = db.info.setdefault(DELTAS_KEY, {"expense": 0.0, "income": 0.0})
+        deltas[kind] += amount
+
+
+def note_stale(db):
+    if isinstance(db, Session):
+        db.info[STALE_KEY] = True
+    else:
+        summary_cache.invalidate()
+
+
+def etag(total_expense: float, total_income: float) -> str:
+    digest = hashlib.sha1(f"{total_expense!r}:{total_income!r}".encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+@event.listens_for(Session, "before_commit")
+def _mark_writing(session):
+    if (DELTAS_KEY in session.info or STALE_KEY in session.info) and not session.info.get(WRITING_KEY):
+        session.info[WRITING_KEY] = True
+        summary_cache.begin_write()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_on_commit(session):
+    deltas = session.info.pop(DELTAS_KEY, None)
+    if session.info.pop(STALE_KEY, False):
+        summary_cache.invalidate()
+    elif deltas:
+        summary_cache.apply(deltas["expense"], deltas["income"])
+    if session.info.pop(WRITING_KEY, False):
+        summary_cache.end_write()
+
+
+@event.listens_for(Session, "after_rollback")
+def _end_failed_commit(session):
+    if session.info.pop(WRITING_KEY, False):
+        summary_cache.end_write()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session, previous_transaction):
+    session.info.pop(DELTAS_KEY, None)
+    session.info.pop(STALE_KEY, None)
@@ -0,0 +1,46 @@
+"""Importing main (what every worker does at startup) must stay cheap.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter and fails when the cumulative
+time of `main` exceeds FINANCE_IMPORT_BUDGET_MS, or when a heavy module that only some endpoints
+need gets imported at startup again: ``python -m pytest test_import_time.py``.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.abspath(__file__))
+BUDGET_MS = float(os.environ.get("FINANCE_IMPORT_BUDGET_MS", "2000"))
+RUNS = 3
+# loaded inside the functions that use them (xlsx export, recurring detection, anomaly scan, async mode)
+LAZY_MODULES = ["pandas", "numpy", "xlsxwriter", "aiosqlite", "sqlalchemy.ext.asyncio"]
+
+
+def import_main():
+    """{module: cumulative µs} for one cold ``import main``."""
+    env = dict(os.environ, FINANCE_DATABASE_URL="sqlite:///:memory:")
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.fixture(scope="module")
+def runs():
+    return [import_main() for _ in range(RUNS)]
+
+
+def test_import_main_within_budget(runs):
+    best_ms = min(t["main"] for t in runs) / 1000
+    assert best_ms <= BUDGET_MS, f"import main took {best_ms:.0f} ms, budget is {BUDGET_MS:.0f} ms (FINANCE_IMPORT_BUDGET_MS)"
+
+
+@pytest.mark.parametrize("module", LAZY_MODULES)
+def test_heavy_module_not_imported_at_startup(runs, module):
+    assert module not in runs[0], f"{module} is imported by main; import it where it is used"
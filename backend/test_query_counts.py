@@ -0,0 +1,99 @@
+"""List endpoints must run a fixed number of SQL statements, however many rows a page holds.
+
+Runs against a throwaway SQLite file, once per FINANCE_DB_MODE: ``python -m pytest test_query_counts.py``.
+"""
+import os
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+import models
+import migrations
+from database import async_db_dependency, get_async_db, get_db
+from routes import expenses, income, budgets
+
+PAGE_SIZES = [1, 10, 100]
+
+
+@pytest.fixture(scope="module", params=["async", "sync"])
+def env(request):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    migrations.bootstrap(engine)
+
+    with Session(bind=engine) as db:
+        cats = [models.Category(name=f"Cat {i}", type="expense") for i in range(5)]
+        db.add_all(cats)
+        db.flush()
+        for i in range(150):
+            day = date(2026, 1, 1) + timedelta(days=i % 60)
+            db.add(models.Expense(amount=10 + i, date=day, category_id=cats[i % 5].id, merchant=f"Shop {i}"))
+            db.add(models.Income(amount=100 + i, date=day, category_id=cats[i % 5].id, source=f"Source {i}"))
+        for i in range(120):
+            db.add(models.Budget(amount=100, start_date=date(2026, 1, 1), category_id=cats[i % 5].id))
+        db.commit()
+
+    app = FastAPI()
+    for router in (expenses.router, income.router, budgets.router):
+        app.include_router(router)
+
+    def override():
+        db = Session(bind=engine)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}") if request.param == "async" else None
+    app.dependency_overrides[get_async_db] = async_db_dependency(engine, async_engine)
+
+    statements = []
+    for e in (engine, async_engine and async_engine.sync_engine):
+        if e is not None:
+            event.listen(e, "before_cursor_execute", lambda conn, cursor, stmt, *args: statements.append(stmt))
+    with TestClient(app) as client:
+        yield client, statements
+    engine.dispose()
+    os.remove(path)
+
+
+def count_statements(client, statements, url, params):
+    statements.clear()
+    response = client.get(url, params=params)
+    assert response.status_code == 200, response.text
+    return len(statements), response
+
+
+@pytest.mark.parametrize("url", ["/expenses/", "/income/", "/budgets/"])
+def test_list_statement_count_is_constant(env, url):
+    client, statements = env
+    counts = {}
+    for size in PAGE_SIZES:
+        counts[size], response = count_statements(client, statements, url, {"limit": size})
+        assert len(response.json()) == size
+        assert all(row["category"] is not None for row in response.json())
+    assert len(set(counts.values())) == 1, counts
+
+
+@pytest.mark.parametrize("url", ["/expenses/", "/income/"])
+def test_cursor_and_projection_statement_count_is_constant(env, url):
+    client, statements = env
+    first = client.get(url, params={"limit": 5})
+    cursor = first.headers["X-Next-Cursor"]
+    cursor_counts, projected_counts = set(), set()
+    for size in PAGE_SIZES:
+        n, _ = count_statements(client, statements, url, {"limit": size, "cursor": cursor})
+        cursor_counts.add(n)
+        n, response = count_statements(client, statements, url, {"limit": size, "fields": "id,amount,category"})
+        assert set(response.json()[0]) == {"id", "amount", "category"}
+        projected_counts.add(n)
+    assert len(cursor_counts) == 1, cursor_counts
+    assert len(projected_counts) == 1, projected_counts
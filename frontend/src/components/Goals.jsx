@@ -1,18 +1,20 @@
 import React, { useEffect, useState } from 'react';
-import { getGoals, deleteGoal, getGoalProgress, addToGoal } from '../services/api';
+import { getGoals, deleteGoal, getGoalsProgress, addToGoal } from '../services/api';
 import GoalForm from './GoalForm';
 import { useCurrency } from '../context/CurrencyContext';
 
 const Goals = () => {
     const [goals, setGoals] = useState([]);
+    const [progress, setProgress] = useState({});
     const [loading, setLoading] = useState(false);
     const { currency } = useCurrency();
 
     const fetchGoals = async () => {
         setLoading(true);
         try {
-            const res = await getGoals();
+            const [res, prog] = await Promise.all([getGoals(), getGoalsProgress()]);
             setGoals(res.data || []);
+            setProgress(Object.fromEntries((prog.data || []).map(p => [p.id, p])));
         } catch (err) { console.error(err); }
         setLoading(false);
     };
@@ -52,7 +54,7 @@ const Goals = () => {
                                 <button className="btn" onClick={() => remove(g.id)}>Delete</button>
                             </div>
                         </div>
-                        <GoalProgressPreview id={g.id} />
+                        <GoalProgressPreview progress={progress[g.id]} />
                     </div>
                 ))}
             </div>
@@ -60,21 +62,7 @@ const Goals = () => {
     )
 }
 
-const GoalProgressPreview = ({ id }) => {
-    const [progress, setProgress] = useState(null);
-
-    useEffect(() => {
-        let mounted = true;
-        const load = async () => {
-            try {
-                const res = await getGoalProgress(id);
-                if (mounted) setProgress(res.data);
-            } catch (err) { console.error(err); }
-        };
-        load();
-        return () => { mounted = false; }
-    }, [id]);
-
+const GoalProgressPreview = ({ progress }) => {
     if (!progress) return null;
 
     return (
@@ -8,11 +8,13 @@ const api = axios.create({
 
 export const getExpenses = (params) => api.get('/expenses/', { params });
 export const createExpense = (expense) => api.post('/expenses/', expense);
+export const bulkCreateExpenses = (items) => api.post('/expenses/bulk', items);
 export const updateExpense = (id, expense) => api.put(`/expenses/${id}`, expense);
 export const deleteExpense = (id) => api.delete(`/expenses/${id}`);
 
 export const getIncome = (params) => api.get('/income/', { params });
 export const createIncome = (income) => api.post('/income/', income);
+export const bulkCreateIncome = (items) => api.post('/income/bulk', items);
 export const updateIncome = (id, income) => api.put(`/income/${id}`, income);
 export const deleteIncome = (id) => api.delete(`/income/${id}`);
 
@@ -38,8 +40,10 @@ export const updateGoal = (id, goal) => api.put(`/goals/${id}`, goal);
 export const deleteGoal = (id) => api.delete(`/goals/${id}`);
 export const addToGoal = (id, amount) => api.post(`/goals/${id}/add`, amount);
 export const getGoalProgress = (id) => api.get(`/goals/${id}/progress`);
+export const getGoalsProgress = () => api.get('/goals/progress');
 
 export const predictCategory = (data) => api.post('/ai/predict_category', data);
+export const predictCategoryBatch = (items) => api.post('/ai/predict_category/batch', items);
 export const confirmCategory = (data) => api.post('/ai/confirm_category', data);
 export const checkRecurring = (data) => api.post('/ai/recurring_check', data);
 export const confirmRecurring = (data) => api.post('/ai/recurring_confirm', data);